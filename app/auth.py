@@ -2,7 +2,11 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from typing import Dict
+import hashlib
 import os
+import time
+from .cache import MISSING, TTLCache
 
 # Configurações do JWT
 SECRET_KEY = os.getenv("JWT_SECRET", "supersecret")
@@ -10,6 +14,10 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 FAKE_USER = {"username": "admin", "password": "admin123"}
 
+# Cache das claims de tokens já verificados (evita decodificar e validar a assinatura a cada requisição)
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "4096"))
+
 # Para autenticação OAuth2 padrão
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
@@ -19,16 +27,36 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Token inválido ou não fornecido",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+_claims_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES)
+
+
+def decode_token(token: str) -> Dict:
+    """
+    Valida o token (assinatura, expiração e usuário) e retorna as suas claims.
+    - Lança `JWTError` se o token for inválido, expirado ou de um usuário desconhecido.
+    - Tokens válidos ficam em cache, pela hash do token, até o seu `exp`: as chamadas
+      seguintes com o mesmo token não repetem a decodificação nem a verificação HMAC.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    if AUTH_CACHE_ENABLED:
+        claims = _claims_cache.get(key)
+        if claims is not MISSING:
+            return claims
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if claims.get("sub") != FAKE_USER["username"]:
+        raise JWTError("Usuário do token não reconhecido")
+    expires_in = claims.get("exp", 0) - time.time()
+    if AUTH_CACHE_ENABLED and expires_in > 0:  # Tokens sem 'exp' não são armazenados
+        _claims_cache.set(key, claims, expires_in)
+    return claims
+
+
+def verify_token(token: str = Depends(oauth2_scheme)) -> Dict:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username != FAKE_USER["username"]:
-            raise credentials_exception
+        return decode_token(token)
     except JWTError:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=401,
+            detail="Token inválido ou não fornecido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
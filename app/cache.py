@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable, Tuple
+import os
+import threading
+import time
+
+# Configurações do cache em memória
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache LRU com tamanho máximo e expiração (TTL) por entrada.
+    Seguro para uso concorrente entre as threads do servidor.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """ Retorna o valor da chave ou `MISSING` se não existir ou estiver expirado. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """ Armazena o valor, removendo a entrada menos usada se o cache estiver cheio. """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache = TTLCache(CACHE_MAX_ENTRIES)
+_data_version = 0
+
+
+def data_version() -> int:
+    """ Versão atual dos dados. Muda a cada nova carga no banco. """
+    return _data_version
+
+
+def bump_data_version() -> int:
+    """
+    Invalida todo o cache de uma vez. Deve ser chamada sempre que uma carga
+    (ingestão do CSV, novo scraping) alterar os dados do banco.
+    """
+    global _data_version
+    _data_version += 1
+    _cache.clear()
+    return _data_version
+
+
+def cached(ttl: float) -> Callable:
+    """
+    Decorator de cache read-through para funções de serviço no formato `fn(db, *args, **kwargs)`.
+    A chave é montada a partir do nome da função, da versão dos dados e dos argumentos (exceto `db`).
+    Exceções (ex.: HTTPException 404) não são armazenadas.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(db, *args, **kwargs):
+            if not CACHE_ENABLED:
+                return func(db, *args, **kwargs)
+            key = (func.__module__, func.__qualname__, _data_version, args, tuple(sorted(kwargs.items())))
+            value = _cache.get(key)
+            if value is MISSING:
+                value = func(db, *args, **kwargs)
+                _cache.set(key, value, ttl)
+            return value
+        return wrapper
+    return decorator
+
+
+def get_stats() -> dict:
+    """ Retorna os contadores do cache para monitoramento e ajuste. """
+    lookups = _cache.hits + _cache.misses
+    return {
+        "enabled": CACHE_ENABLED,
+        "data_version": _data_version,
+        "entries": len(_cache),
+        "max_entries": _cache.max_entries,
+        "hits": _cache.hits,
+        "misses": _cache.misses,
+        "evictions": _cache.evictions,
+        "hit_ratio": round(_cache.hits / lookups, 4) if lookups else 0.0,
+    }
@@ -1,10 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable
 import os
-import csv
+import itertools
 import logging
-from . import models
+from . import metrics, models, profiler, stats
 
 # Configuração do Logging 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,62 +16,219 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Configuração do Banco de Dados
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/data.db")
 
+# Réplicas somente leitura usadas pelas rotas GET (URLs separadas por vírgula)
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+
 # Corrige para SQLAlchemy aceitar 'postgresql://'
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def _normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+DATABASE_URL = _normalize_url(DATABASE_URL)
+DATABASE_READ_URLS = [_normalize_url(url) for url in DATABASE_READ_URLS]
+
+# Configurações do pool de conexões
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Ajustes do SQLite aplicados em cada nova conexão
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # Valores negativos são em KiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def _apply_sqlite_pragmas(dbapi_connection, pragmas) -> None:
+    """ Executa os PRAGMAs na conexão. Falhas são registradas sem impedir a conexão. """
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            try:
+                cursor.execute(pragma)
+            except Exception as e:
+                logging.warning(f"Não foi possível aplicar '{pragma}': {e}")
+    finally:
+        cursor.close()
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Aplica os PRAGMAs de desempenho do SQLite. Com WAL, leitores não bloqueiam
+    durante a escrita da ingestão. Falhas (ex.: sistema de arquivos somente leitura)
+    são registradas sem impedir a conexão.
+    """
+    _apply_sqlite_pragmas(dbapi_connection, (
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    ))
+
+def _set_sqlite_read_only_pragmas(dbapi_connection, connection_record):
+    """
+    PRAGMAs das réplicas: os de leitura e `query_only`, que faz o SQLite recusar qualquer escrita
+    na conexão. O `journal_mode` não é alterado, pois a troca do modo grava no arquivo do banco.
+    """
+    _apply_sqlite_pragmas(dbapi_connection, (
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA query_only=ON",
+    ))
+
+def _read_only_connect_args(url: str) -> dict:
+    """
+    Argumentos de conexão que tornam as transações somente leitura no Postgres
+    (`default_transaction_read_only`): uma escrita acidental em uma rota GET falha em vez de
+    gravar na réplica. No SQLite, o equivalente é o `PRAGMA query_only` aplicado na conexão.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        if parsed.get_backend_name() != "sqlite":
+            logging.warning(f"Somente leitura não é aplicado nas réplicas do banco '{parsed.get_backend_name()}'.")
+        return {}
+    if parsed.get_driver_name() == "asyncpg":
+        return {"server_settings": {"default_transaction_read_only": "on"}}
+    return {"options": "-c default_transaction_read_only=on"}
+
+def _engine_options(url: str, read_only: bool = False) -> dict:
+    """ Monta os argumentos de `create_engine` conforme o banco da URL. """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if read_only:
+        options["connect_args"] = _read_only_connect_args(url)
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            # Bancos em memória usam um pool próprio, sem tamanho configurável
+            return options
+        if "aiosqlite" not in url:
+            options.setdefault("connect_args", {})["check_same_thread"] = False
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+def _create_engine(url: str, name: str, read_only: bool = False):
+    db_engine = create_engine(url, **_engine_options(url, read_only))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_read_only_pragmas if read_only else _set_sqlite_pragmas)
+    metrics.instrument_engine(db_engine, name)
+    profiler.instrument_engine(db_engine)
+    return db_engine
+
+def _create_async_engine(url: str, name: str, read_only: bool = False):
+    db_engine = create_async_engine(url, **_engine_options(url, read_only))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_read_only_pragmas if read_only else _set_sqlite_pragmas)
+    metrics.instrument_engine(db_engine.sync_engine, name)
+    profiler.instrument_engine(db_engine.sync_engine)
+    return db_engine
+
+engine = _create_engine(DATABASE_URL, "primary")
+# As réplicas são abertas em modo somente leitura (ver `_read_only_connect_args`)
+read_engines = [_create_engine(url, f"read-{position}", read_only=True) for position, url in enumerate(DATABASE_READ_URLS)]
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocals = [sessionmaker(autocommit=False, autoflush=False, bind=read_engine) for read_engine in read_engines]
 Base = declarative_base()
 
-def get_db():
+# Ingestão na inicialização: 'empty' (apenas com a tabela vazia) ou 'upsert' (carga incremental sempre)
+INGEST_ON_STARTUP = os.getenv("INGEST_ON_STARTUP", "empty").lower()
+
+# Modo assíncrono (aiosqlite / asyncpg) para as rotas. O modo síncrono continua disponível.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+def _async_database_url(url: str) -> str:
+    """ Converte a URL síncrona para o driver assíncrono equivalente. """
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocals = []
+if DB_ASYNC:
+    ASYNC_DATABASE_URL = os.getenv("DATABASE_ASYNC_URL", _async_database_url(DATABASE_URL))
+    async_engine = _create_async_engine(ASYNC_DATABASE_URL, "async-primary")
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocals = [
+        async_sessionmaker(_create_async_engine(_async_database_url(url), f"async-read-{position}", read_only=True), autoflush=False, expire_on_commit=False)
+        for position, url in enumerate(DATABASE_READ_URLS)
+    ]
+
+# Distribui as leituras entre as réplicas (round-robin); sem réplicas, usa o banco principal
+_read_sessions = itertools.cycle(ReadSessionLocals or [SessionLocal])
+_async_read_sessions = itertools.cycle(AsyncReadSessionLocals or [AsyncSessionLocal])
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def new_read_session():
+    """ Abre uma sessão síncrona na próxima réplica de leitura (ou no banco principal). """
+    return next(_read_sessions)()
+
+def get_sync_read_db():
+    db = new_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with next(_async_read_sessions)() as db:
+        yield db
+
+# Dependências usadas pelas rotas: sessão assíncrona ou síncrona conforme DB_ASYNC.
+# Rotas somente leitura (GET) usam `get_read_db`, que pode apontar para as réplicas.
+get_db = get_async_db if DB_ASYNC else get_sync_db
+get_read_db = get_async_read_db if DB_ASYNC else get_sync_read_db
+
+async def run_db(db, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa uma função de serviço síncrona `func(db, *args, **kwargs)` a partir de uma rota assíncrona.
+    - Com `AsyncSession`, a função roda via `run_sync`, sem bloquear o event loop.
+    - Com `Session` síncrona, a função roda no threadpool, como nas rotas `def`.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: func(session, *args, **kwargs))
+    return await run_in_threadpool(func, db, *args, **kwargs)
+
 # Função para popular o banco de dados
 def check_and_populate_db():
     """
     Verifica se a tabela 'books' está vazia e, se estiver,
-    a popula com os dados do arquivo books.csv.
+    a popula com os dados do arquivo books.csv ou books.parquet, o mais recente (carga em lotes).
+    Com `INGEST_ON_STARTUP=upsert`, aplica o arquivo de forma incremental mesmo com a tabela já populada.
     """
+    from .ingest import default_source_path, ingest_file
+    from .ml.feature_store import sync_feature_store
+
     db = SessionLocal()
     try:
-        if db.query(models.Book).first() is None:
-            logging.info("Banco de dados vazio. Ingerindo dados a partir do CSV...")
-            
-            csv_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'books.csv')
-            
-            if not os.path.exists(csv_path):
-                logging.warning(f"Arquivo {csv_path} não encontrado. Nenhum dado foi inserido. Execute o scraper primeiro.")
+        is_empty = db.query(models.Book.id).first() is None
+        if is_empty or INGEST_ON_STARTUP == "upsert":
+            source_path = default_source_path()
+            if not os.path.exists(source_path):
+                logging.warning(f"Arquivo {source_path} não encontrado. Nenhum dado foi inserido. Execute o scraper primeiro.")
                 return
-
-            with open(csv_path, mode='r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                books_to_add = [
-                    models.Book(
-                        title=row['title'],
-                        price=float(row['price']),
-                        rating=row['rating'],
-                        availability=row['availability'],
-                        category=row['category'],
-                        image_url=row['image_url']
-                    ) for row in reader
-                ]
-                
-                if books_to_add:
-                    db.add_all(books_to_add)
-                    db.commit()
-                    logging.info(f"{len(books_to_add)} livros foram adicionados ao banco de dados.")
-                else:
-                    logging.info("CSV encontrado, mas está vazio. Nenhum livro adicionado.")
+            logging.info(f"Ingerindo dados a partir de {os.path.basename(source_path)}...")
+            report = ingest_file(db, source_path)
+            if report['rows'] == 0:
+                logging.info("Arquivo encontrado, mas está vazio. Nenhum livro adicionado.")
         else:
-            logging.info("O banco de dados já contém dados. Nenhuma ação necessária.")
+            logging.info("O banco de dados já contém dados. Nenhuma ingestão necessária.")
+        stats.ensure_stats(db)
+        sync_feature_store(db)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
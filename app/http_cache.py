@@ -0,0 +1,64 @@
+from fastapi import Request, Response, status
+from typing import Any, Awaitable, Callable, Dict, Optional
+import hashlib
+import os
+import orjson
+from .cache import MISSING, TTLCache, data_version
+
+# Políticas de Cache-Control enviadas em cada grupo de endpoints
+CACHE_CONTROL = {
+    "books": os.getenv("CACHE_CONTROL_BOOKS", "public, max-age=60"),
+    "categories": os.getenv("CACHE_CONTROL_CATEGORIES", "public, max-age=300"),
+    "stats": os.getenv("CACHE_CONTROL_STATS", "public, max-age=300"),
+    "ml": os.getenv("CACHE_CONTROL_ML", "private, no-cache"),
+}
+
+# Cache das respostas já serializadas, para responder sem consultar o banco nem serializar de novo
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", "300"))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "256"))
+
+_responses = TTLCache(HTTP_CACHE_MAX_ENTRIES)
+
+
+def _make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """ Compara o header If-None-Match com a ETag (comparação fraca, como define a RFC 9110). """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+async def conditional_response(
+    request: Request,
+    policy: str,
+    produce: Callable[[], Awaitable[Any]],
+    headers: Optional[Callable[[], Dict[str, str]]] = None,
+) -> Response:
+    """
+    Responde uma requisição GET com suporte a ETag / If-None-Match e Cache-Control.
+    - `produce` executa a consulta e retorna o JSON já serializado (bytes) ou tipos nativos
+      (dicionários, listas), serializados diretamente com orjson, sem passar pelos schemas Pydantic.
+      Os `response_model` das rotas ficam apenas para a documentação (OpenAPI).
+    - `headers`, se informado, é chamado depois de `produce` e retorna headers extras (ex.: cursor).
+    - O corpo serializado e a ETag (hash do conteúdo) ficam em cache até a próxima carga de dados.
+    - Retorna 304 sem corpo quando o cliente já possui a versão atual.
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), data_version())
+    entry = _responses.get(key)
+    if entry is MISSING:
+        content = await produce()
+        extra_headers = headers() if headers else {}
+        body = content if isinstance(content, bytes) else orjson.dumps(content)
+        entry = (body, _make_etag(body), extra_headers)
+        _responses.set(key, entry, HTTP_CACHE_TTL)
+
+    body, etag, extra_headers = entry
+    response_headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL[policy], **extra_headers}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,302 @@
+from sqlalchemy import bindparam, inspect, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional
+import argparse
+import csv
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import sys
+import time
+from . import models, stats
+from .cache import bump_data_version
+from .ml import feature_store
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# O pyarrow só é importado ao ler um arquivo Parquet. Sem ele, apenas o CSV pode ser carregado
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Configurações da ingestão
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'books.csv')
+DEFAULT_PARQUET_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'books.parquet')
+# Arquivo usado na carga automática (CSV ou Parquet). Sem valor, usa o mais recente entre os padrões.
+INGEST_SOURCE_PATH = os.getenv("INGEST_SOURCE_PATH")
+
+# Colunas de 'books' preenchidas a partir do CSV
+BOOK_COLUMNS = ('title', 'price', 'rating', 'availability', 'category', 'image_url')
+
+
+# Valores gravados pelo scraper quando um campo não é encontrado na página
+MISSING_VALUES = ('', 'N/A')
+
+
+def _present(value) -> Optional[str]:
+    """ Valor do campo como texto, ou None se ausente (vazio ou 'N/A'). """
+    if value is None:
+        return None
+    text = str(value).strip()
+    return None if text in MISSING_VALUES else text
+
+
+def make_source_key(row: Dict[str, str]) -> str:
+    """
+    Gera o identificador estável de um livro do CSV, usado nas cargas incrementais.
+    Usa a URL da capa (única por livro no site) ou, na falta dela, a combinação de título e
+    categoria, para que livros diferentes sem capa não compartilhem a mesma chave. O preço fica
+    de fora para que uma mudança de preço atualize o livro em vez de criar outro. Limitação:
+    livros sem capa com o mesmo título na mesma categoria são tratados como um só.
+    """
+    identity = _present(row.get('image_url'))
+    if identity is None:
+        identity = '|'.join((_present(row.get('title')) or '', _present(row.get('category')) or ''))
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+def ensure_source_key_column(engine: Engine) -> None:
+    """
+    Adiciona a coluna 'source_key' em bancos criados antes dela existir,
+    preenchendo-a para os livros já cadastrados e criando o índice único.
+    """
+    columns = {column['name'] for column in inspect(engine).get_columns('books')}
+    if 'source_key' in columns:
+        return
+    logging.info("Adicionando a coluna 'source_key' à tabela 'books'...")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE books ADD COLUMN source_key VARCHAR"))
+        rows = conn.execute(select(models.Book.id, models.Book.title, models.Book.category, models.Book.price, models.Book.image_url)).mappings().all()
+        if rows:
+            conn.execute(
+                update(models.Book.__table__).where(models.Book.id == bindparam('book_id')),
+                [{'book_id': row['id'], 'source_key': make_source_key(row)} for row in rows]
+            )
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_books_source_key ON books (source_key)"))
+
+
+def _parse_row(row: Dict[str, str]) -> Dict:
+    return {
+        'title': row['title'],
+        'price': float(row['price']) if row.get('price') not in (None, '') else None,
+        'rating': row['rating'],
+        'availability': row['availability'],
+        'category': row['category'],
+        'image_url': row['image_url'],
+        'source_key': make_source_key(row),
+    }
+
+
+def default_source_path() -> str:
+    """
+    Arquivo de dados usado na carga automática: `INGEST_SOURCE_PATH`, se definido, ou o mais
+    recente entre `data/books.parquet` (se o pyarrow estiver instalado) e `data/books.csv`.
+    """
+    if INGEST_SOURCE_PATH:
+        return INGEST_SOURCE_PATH
+    candidates = [path for path in (DEFAULT_PARQUET_PATH, DEFAULT_CSV_PATH) if os.path.exists(path)]
+    if not PYARROW_AVAILABLE:
+        candidates = [path for path in candidates if path != DEFAULT_PARQUET_PATH]
+    if not candidates:
+        return DEFAULT_CSV_PATH
+    return max(candidates, key=os.path.getmtime)
+
+
+def iter_csv_batches(csv_path: str, batch_size: int = INGEST_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """
+    Lê o CSV em streaming e gera lotes de linhas já convertidas.
+    Linhas repetidas (mesma 'source_key') são descartadas em `ingest_file`.
+    """
+    with open(csv_path, mode='r', encoding='utf-8', newline='') as csvfile:
+        batch: List[Dict] = []
+        for row in csv.DictReader(csvfile):
+            batch.append(_parse_row(row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def iter_parquet_batches(parquet_path: str, batch_size: int = INGEST_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """
+    Lê o Parquet em lotes (sem carregar o arquivo inteiro) e gera lotes de linhas já convertidas.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("A leitura de arquivos Parquet requer o pacote 'pyarrow'.")
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(parquet_path)
+    columns = [column for column in BOOK_COLUMNS if column in parquet_file.schema_arrow.names]
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield [_parse_row(row) for row in record_batch.to_pylist()]
+
+
+def iter_file_batches(path: str, batch_size: int = INGEST_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """ Lê o arquivo de dados em lotes, escolhendo o formato (CSV ou Parquet) pela extensão. """
+    if path.endswith('.parquet'):
+        return iter_parquet_batches(path, batch_size)
+    return iter_csv_batches(path, batch_size)
+
+
+def _stats_values(row) -> Dict:
+    return {'category': row['category'], 'price': row['price'], 'rating': row['rating']}
+
+
+def _refresh_features(db: Session, rows: List[Dict]) -> None:
+    """ Recalcula no feature store ('ml_data') as features dos livros inseridos ou alterados. """
+    if not rows:
+        return
+    book_ids = db.scalars(
+        select(models.Book.id).where(models.Book.source_key.in_([row['source_key'] for row in rows]))
+    ).all()
+    feature_store.refresh_features(db, book_ids)
+
+
+def _copy_rows(db: Session, rows: List[Dict]) -> None:
+    """ Insere as linhas com COPY no Postgres (driver psycopg2). """
+    columns = BOOK_COLUMNS + ('source_key',)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([row[column] for column in columns] for row in rows)
+    buffer.seek(0)
+    dbapi_connection = db.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY books ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insert_rows(db: Session, rows: List[Dict]) -> None:
+    """ Insere as linhas com um único executemany (ou COPY, no Postgres com psycopg2). """
+    bind = db.get_bind()
+    if bind.dialect.name == 'postgresql' and bind.dialect.driver == 'psycopg2':
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(models.Book.__table__), rows)
+
+
+def _upsert_batch(db: Session, rows: List[Dict]) -> Dict[str, int]:
+    """
+    Aplica um lote de forma incremental: insere livros novos, atualiza os alterados
+    e ignora os que não mudaram. Atualiza as estatísticas pelo delta do lote e
+    recalcula as features apenas dos livros novos ou alterados.
+    """
+    existing = {
+        row['source_key']: row for row in db.execute(
+            select(models.Book.id, models.Book.source_key, *[getattr(models.Book, column) for column in BOOK_COLUMNS])
+            .where(models.Book.source_key.in_([row['source_key'] for row in rows]))
+        ).mappings()
+    }
+    new_rows, changed_rows, previous_rows = [], [], []
+    for row in rows:
+        current = existing.get(row['source_key'])
+        if current is None:
+            new_rows.append(row)
+        elif any(current[column] != row[column] for column in BOOK_COLUMNS):
+            changed_rows.append({**row, 'book_id': current['id']})
+            previous_rows.append(current)
+
+    if new_rows:
+        _insert_rows(db, new_rows)
+    if changed_rows:
+        db.execute(
+            update(models.Book.__table__)
+            .where(models.Book.id == bindparam('book_id'))
+            .values({column: bindparam(column) for column in BOOK_COLUMNS}),
+            changed_rows
+        )
+    stats.apply_book_changes(
+        db,
+        added=[_stats_values(row) for row in new_rows + changed_rows],
+        removed=[_stats_values(row) for row in previous_rows]
+    )
+    _refresh_features(db, new_rows + changed_rows)
+    return {'inserted': len(new_rows), 'updated': len(changed_rows), 'unchanged': len(rows) - len(new_rows) - len(changed_rows)}
+
+
+def _peak_memory_mb() -> Optional[float]:
+    """ Pico de memória residente do processo, em MB (indisponível no Windows). """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # No Linux o valor vem em KB; no macOS, em bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def ingest_file(db: Session, path: str = DEFAULT_CSV_PATH, batch_size: int = INGEST_BATCH_SIZE) -> Dict:
+    """
+    Carrega o arquivo de livros (CSV ou Parquet) em lotes, com uma transação por lote.
+    - Com a tabela vazia, os lotes são apenas inseridos (executemany, ou COPY no Postgres).
+    - Com dados existentes, a carga é incremental: novos livros são inseridos e os alterados
+      são atualizados, usando a 'source_key' como identificador estável.
+    - Linhas repetidas no arquivo (mesma 'source_key', ex.: um livro listado duas vezes) mantêm
+      apenas a primeira ocorrência, em todo o arquivo e não só dentro do lote. As descartadas
+      são contadas em 'duplicates' e não entram em 'rows'.
+    - Retorna (e registra no log) um relatório com contagens, linhas/s e pico de memória.
+    """
+    started = time.perf_counter()
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0, 'batches': 0}
+    initial_load = db.query(models.Book.id).first() is None
+    seen_keys = set()
+
+    for file_batch in iter_file_batches(path, batch_size):
+        batch = []
+        for row in file_batch:
+            if row['source_key'] not in seen_keys:
+                seen_keys.add(row['source_key'])
+                batch.append(row)
+        report['duplicates'] += len(file_batch) - len(batch)
+        if not batch:
+            continue
+        if initial_load:
+            _insert_rows(db, batch)
+            stats.apply_book_changes(db, added=[_stats_values(row) for row in batch])
+            _refresh_features(db, batch)
+            counts = {'inserted': len(batch), 'updated': 0, 'unchanged': 0}
+        else:
+            counts = _upsert_batch(db, batch)
+        db.commit()
+        report['rows'] += len(batch)
+        report['batches'] += 1
+        for key, value in counts.items():
+            report[key] += value
+
+    if report['inserted'] or report['updated']:
+        bump_data_version()
+
+    elapsed = time.perf_counter() - started
+    report['seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['rows'] / elapsed, 1) if elapsed > 0 else 0.0
+    report['peak_memory_mb'] = _peak_memory_mb()
+    logging.info(
+        f"Ingestão concluída: {report['rows']} linhas em {report['seconds']}s "
+        f"({report['rows_per_second']} linhas/s), {report['inserted']} inseridas, "
+        f"{report['updated']} atualizadas, {report['unchanged']} sem alteração, "
+        f"{report['duplicates']} repetidas descartadas. "
+        f"Pico de memória: {report['peak_memory_mb']} MB."
+    )
+    return report
+
+
+def main():
+    """ Executa a ingestão pela linha de comando: `python -m app.ingest [caminho.csv|caminho.parquet]`. """
+    parser = argparse.ArgumentParser(description="Carga em lotes do CSV (ou Parquet) de livros no banco de dados.")
+    parser.add_argument('path', nargs='?', default=DEFAULT_CSV_PATH, help="Caminho do CSV ou Parquet (padrão: data/books.csv).")
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE, help="Quantidade de linhas por lote.")
+    args = parser.parse_args()
+
+    from .database import SessionLocal, engine
+    models.Base.metadata.create_all(bind=engine)
+    ensure_source_key_column(engine)
+    feature_store.ensure_feature_store_schema(engine)
+    db = SessionLocal()
+    try:
+        ingest_file(db, args.path, args.batch_size)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,15 @@
+from . import startup  # Primeiro import: marca o início da medição do tempo de importação
 from fastapi import FastAPI
-from . import models, routes
-from .database import engine, check_and_populate_db 
+from fastapi.responses import ORJSONResponse
+import time
+from . import metrics, models, profiler, routes, similarity
+from .database import engine
 from .ml import ml_routes 
 from .config import api_description, servers
 
-# Cria as tabelas no banco de dados
-models.Base.metadata.create_all(bind=engine)
+# Cria as tabelas no banco de dados e aplica as migrações
+# (na inicialização rápida, apenas se o marcador de versão do esquema não conferir)
+startup.prepare_schema(engine)
 
 # Cria a instância principal da aplicação FastAPI
 app = FastAPI(
@@ -13,15 +17,32 @@ app = FastAPI(
     version="0.1.0",
     description=api_description,
     servers=servers,
+    # Respostas serializadas com orjson (mais rápido que o JSONResponse padrão)
+    default_response_class=ORJSONResponse,
 )
 
 # Popula o banco de dados na inicialização
 @app.on_event("startup")
 def on_startup():
-    check_and_populate_db() 
+    started = time.perf_counter()
+    data_check = startup.check_data(engine) if startup.needs_data_check() else "skipped"
+    # Na inicialização rápida, o modelo e o índice de similares são carregados no primeiro uso
+    if not startup.FAST_START:
+        from .ml import rating_model
+        rating_model.load_model()
+        similarity.load_index()
+    startup.record_startup(started, data_check)
+
+# Mede cada requisição (latência por rota e consultas SQL) para o endpoint /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+# Perfila as consultas SQL (PROFILER_ENABLED ou header X-Profile: 1)
+app.add_middleware(profiler.ProfilerMiddleware)
 
 # Inclui os roteadores na aplicação
+app.include_router(metrics.router)
+app.include_router(profiler.router)
 app.include_router(routes.router)
 app.include_router(ml_routes.router)
 
-    
\ No newline at end of file
+# Tempo de importação da aplicação (cold start), exposto em /api/v1/startup/stats e em /metrics
+startup.record_import()
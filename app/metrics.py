@@ -0,0 +1,336 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+import time
+
+# Configurações das métricas
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Limites (em segundos) dos buckets dos histogramas de latência
+LATENCY_BUCKETS = tuple(float(value) for value in os.getenv(
+    "METRICS_LATENCY_BUCKETS", "0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+).split(","))
+# Limites dos buckets da quantidade de consultas por requisição
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Rótulo usado para requisições sem rota correspondente (evita um rótulo por URL) e para consultas fora de requisições
+UNMATCHED_ROUTE = "unmatched"
+NO_ROUTE = "none"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """ Contador monotônico com rótulos, seguro para uso concorrente. """
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in values]
+
+
+class Gauge(Counter):
+    """ Valor que sobe e desce (ex.: requisições em andamento). """
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    """ Histograma cumulativo com rótulos, no formato do Prometheus (`_bucket`, `_sum`, `_count`). """
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de rótulos: [contagem por bucket (+Inf no final), soma, total]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][position] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        lines = []
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for limit, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.label_names + ("le",), labels + (_format_value(limit),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+# ---- Métricas registradas
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requisições HTTP atendidas.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Latência das requisições HTTP por rota.", ("method", "route"))
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "Requisições HTTP em andamento.")
+DB_QUERIES = Counter("db_queries_total", "Consultas SQL executadas, pela rota da requisição.", ("route",))
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "Duração de cada consulta SQL, pela rota da requisição.", ("route",))
+DB_QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "Quantidade de consultas SQL por requisição.", ("route",), QUERY_COUNT_BUCKETS)
+DB_TIME_PER_REQUEST = Histogram("db_time_per_request_seconds", "Tempo total em consultas SQL por requisição.", ("route",))
+POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Conexões emprestadas pelo pool.", ("engine",))
+POOL_CONNECTIONS_OPENED = Counter("db_pool_connections_opened_total", "Conexões novas abertas pelo pool.", ("engine",))
+POOL_CONNECTION_HELD = Histogram("db_pool_connection_held_seconds", "Tempo entre o checkout e a devolução de uma conexão ao pool.", ("engine",))
+
+REGISTRY = [
+    HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_PROGRESS,
+    DB_QUERIES, DB_QUERY_LATENCY, DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST,
+    POOL_CHECKOUTS, POOL_CONNECTIONS_OPENED, POOL_CONNECTION_HELD,
+]
+
+# Funções chamadas a cada coleta, que retornam métricas calculadas na hora: (nome, tipo, descrição, [(rótulos, valor)])
+_collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+
+
+def register_collector(collector: Callable) -> None:
+    _collectors.append(collector)
+
+
+def _cache_state():
+    from . import cache
+    stats = cache.get_stats()
+    return [
+        ("app_cache_hits_total", "counter", "Acertos do cache de consultas.", [({}, stats["hits"])]),
+        ("app_cache_misses_total", "counter", "Falhas do cache de consultas.", [({}, stats["misses"])]),
+        ("app_cache_entries", "gauge", "Entradas no cache de consultas.", [({}, stats["entries"])]),
+    ]
+
+
+register_collector(_cache_state)
+
+
+def _startup_state():
+    from . import startup
+    timings = startup.get_timings()
+    return [
+        (f"app_{name}", "gauge", description, [({}, timings[name])])
+        for name, description in (
+            ("import_seconds", "Tempo de importação da aplicação (cold start)."),
+            ("schema_seconds", "Tempo de preparação do esquema do banco na importação."),
+            ("startup_seconds", "Duração do evento de inicialização."),
+        )
+        if timings[name] is not None
+    ]
+
+
+register_collector(_startup_state)
+
+
+# ---- Contexto da requisição (compartilhado com o threadpool e com o `run_sync` das sessões assíncronas)
+
+class RequestStats:
+    """ Acumula as consultas SQL de uma requisição. """
+    __slots__ = ("scope", "queries", "query_time")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.query_time = 0.0
+
+    @property
+    def route(self) -> str:
+        # O roteamento grava a rota encontrada no escopo antes de executar o endpoint
+        return _route_template(self.scope)
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP: contagem por status e latência por rota,
+    usando o template da rota (ex.: `/api/v1/books/{book_id}`) como rótulo, além da
+    quantidade e do tempo das consultas SQL feitas durante a requisição.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_PROGRESS.dec()
+            _request_stats.reset(token)
+            route = _route_template(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, str(status_code))
+            HTTP_LATENCY.observe(elapsed, method, route)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route)
+            DB_TIME_PER_REQUEST.observe(stats.query_time, route)
+
+
+# ---- Instrumentação do SQLAlchemy
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _request_stats.get()
+    if stats is None:
+        DB_QUERIES.inc(NO_ROUTE)
+        DB_QUERY_LATENCY.observe(elapsed, NO_ROUTE)
+        return
+    stats.queries += 1
+    stats.query_time += elapsed
+    DB_QUERIES.inc(stats.route)
+    DB_QUERY_LATENCY.observe(elapsed, stats.route)
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Registra os eventos do SQLAlchemy que medem as consultas (`before/after_cursor_execute`)
+    e o pool de conexões (apenas eventos públicos): checkouts, conexões abertas e tempo com a
+    conexão emprestada. Também expõe, a cada coleta, o estado do pool (tamanho, conexões em uso
+    e overflow); com todas as conexões em uso, as próximas requisições esperam no checkout.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    pool = engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        POOL_CONNECTIONS_OPENED.inc(name)
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.inc(name)
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            POOL_CONNECTION_HELD.observe(time.perf_counter() - checked_out_at, name)
+
+    def _pool_state():
+        gauges = []
+        for metric, method, description in (
+            ("db_pool_size", "size", "Tamanho configurado do pool."),
+            ("db_pool_checked_out", "checkedout", "Conexões em uso."),
+            ("db_pool_checked_in", "checkedin", "Conexões livres no pool."),
+            ("db_pool_overflow", "overflow", "Conexões além do tamanho do pool."),
+        ):
+            if hasattr(pool, method):
+                # O SQLAlchemy conta o overflow a partir de -pool_size; valores negativos significam "sem overflow"
+                value = max(getattr(pool, method)(), 0)
+                gauges.append((metric, "gauge", description, [({"engine": name}, value)]))
+        return gauges
+
+    register_collector(_pool_state)
+
+
+# ---- Exposição no formato texto do Prometheus
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    # Métricas calculadas na coleta, agrupadas por nome (um bloco HELP/TYPE por métrica)
+    collected: Dict[str, Tuple[str, str, list]] = {}
+    for collector in _collectors:
+        for name, kind, description, samples in collector():
+            collected.setdefault(name, (kind, description, []))[2].extend(samples)
+    for name, (kind, description, samples) in collected.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Métricas da API no formato do Prometheus",
+    tags=["Monitoring"]
+)
+def get_metrics():
+    """
+    Retorna as métricas no formato texto do Prometheus: requisições e latência por rota,
+    consultas SQL (quantidade e duração, por requisição) e o estado do pool de conexões.
+    """
+    return PlainTextResponse(render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,93 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import os
+import time
+
+# Configurações do micro-batching das predições individuais
+PREDICTION_MICRO_BATCHING = os.getenv("PREDICTION_MICRO_BATCHING", "true").lower() == "true"
+PREDICTION_BATCH_WINDOW_MS = float(os.getenv("PREDICTION_BATCH_WINDOW_MS", "2"))
+PREDICTION_BATCH_MAX_SIZE = int(os.getenv("PREDICTION_BATCH_MAX_SIZE", "256"))
+
+# Limites superiores dos buckets do histograma de tamanho de lote
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class MicroBatcher:
+    """
+    Agrupa chamadas concorrentes de um item em lotes para uma função vetorizada.
+    - O primeiro item de um lote abre uma janela de `window_ms`; o lote é executado ao fim
+      da janela ou assim que atingir `max_batch_size` itens, o que ocorrer primeiro.
+    - `func` recebe a lista de itens e retorna os resultados na mesma ordem. Cada chamador
+      recebe o seu resultado (ou a exceção do lote).
+    - Roda no event loop: `func` deve ser rápida (ex.: uma multiplicação de matrizes).
+    """
+    def __init__(self, func: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = PREDICTION_BATCH_MAX_SIZE,
+                 window_ms: float = PREDICTION_BATCH_WINDOW_MS):
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.window_ms = window_ms
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Métricas
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.batch_size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    async def submit(self, item: Any) -> Any:
+        """ Enfileira o item no lote atual e aguarda o seu resultado. """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self._record(batch)
+        try:
+            results = self.func([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():  # O chamador pode ter desistido (ex.: conexão encerrada)
+                future.set_result(result)
+
+    def _record(self, batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        waits = [started - enqueued for _, _, enqueued in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.queue_wait_total += sum(waits)
+        self.queue_wait_max = max(self.queue_wait_max, max(waits))
+        bucket = next((position for position, limit in enumerate(BATCH_SIZE_BUCKETS) if len(batch) <= limit), len(BATCH_SIZE_BUCKETS))
+        self.batch_size_histogram[bucket] += 1
+
+    def get_stats(self) -> Dict:
+        """ Retorna as métricas de tamanho de lote e de espera na fila. """
+        labels = [f"<={limit}" for limit in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "batch_size_histogram": dict(zip(labels, self.batch_size_histogram)),
+            "avg_queue_wait_ms": round(self.queue_wait_total / self.items * 1000, 3) if self.items else 0.0,
+            "max_queue_wait_ms": round(self.queue_wait_max * 1000, 3),
+        }
@@ -0,0 +1,76 @@
+from sqlalchemy import delete, insert, inspect, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional
+import logging
+import os
+from .. import models
+from . import ml_models, ml_services
+
+# Quantidade de livros recalculados por consulta na sincronização
+FEATURE_REFRESH_BATCH_SIZE = int(os.getenv("FEATURE_REFRESH_BATCH_SIZE", "5000"))
+
+
+def ensure_feature_store_schema(engine: Engine) -> None:
+    """
+    Adiciona a coluna 'feature_version' e o índice único de 'book_id' em bancos criados
+    antes do feature store. As linhas antigas (sem versão) são descartadas e recalculadas
+    por `sync_feature_store`.
+    """
+    columns = {column['name'] for column in inspect(engine).get_columns('ml_data')}
+    if 'feature_version' in columns:
+        return
+    logging.info("Adicionando a coluna 'feature_version' à tabela 'ml_data'...")
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM ml_data"))
+        conn.execute(text("ALTER TABLE ml_data ADD COLUMN feature_version INTEGER"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_ml_data_book_id ON ml_data (book_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_ml_data_feature_version ON ml_data (feature_version)"))
+
+
+def refresh_features(db: Session, book_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recalcula e grava no feature store as features dos livros informados (ou de todos, se `None`).
+    Livros que não existem mais têm suas linhas removidas. Não faz commit.
+    """
+    feature = ml_models.BookFeature
+    statement = ml_services.get_books_source_statement()
+    if book_ids is None:
+        db.execute(delete(feature))
+    else:
+        book_ids = list(book_ids)
+        if not book_ids:
+            return 0
+        statement = statement.where(models.Book.id.in_(book_ids))
+        db.execute(delete(feature).where(feature.book_id.in_(book_ids)))
+
+    import pandas as pd
+    books = pd.read_sql(statement, db.connection())
+    if books.empty:
+        return 0
+    db.execute(insert(feature.__table__), ml_services.compute_features(books).to_dict('records'))
+    return len(books)
+
+
+def sync_feature_store(db: Session) -> None:
+    """
+    Garante que o feature store esteja completo e na versão atual: calcula as features de livros
+    sem linha em 'ml_data' ou com versão antiga e remove linhas de livros inexistentes.
+    Executada na inicialização; faz commit se algo mudar.
+    """
+    feature = ml_models.BookFeature
+    stale_ids = db.scalars(
+        select(models.Book.id)
+        .outerjoin(feature, feature.book_id == models.Book.id)
+        .where(or_(feature.id.is_(None), feature.feature_version != ml_services.FEATURE_SET_VERSION))
+    ).all()
+    orphans = db.execute(delete(feature).where(feature.book_id.not_in(select(models.Book.id)))).rowcount
+
+    for start in range(0, len(stale_ids), FEATURE_REFRESH_BATCH_SIZE):
+        refresh_features(db, stale_ids[start:start + FEATURE_REFRESH_BATCH_SIZE])
+    if stale_ids or orphans:
+        db.commit()
+        logging.info(
+            f"Feature store sincronizado (versão {ml_services.FEATURE_SET_VERSION}): "
+            f"{len(stale_ids)} livros recalculados, {orphans} linhas órfãs removidas."
+        )
@@ -3,13 +3,15 @@ from ..database import Base
 
 class BookFeature(Base):
     """
-    Modelo SQLAlchemy para a tabela 'ml_data'.
-    Armazena os dados pré-processados e prontos para ML.
+    Modelo SQLAlchemy para a tabela 'ml_data' (feature store).
+    Armazena os dados pré-processados e prontos para ML: uma linha por livro,
+    materializada na ingestão e carimbada com a versão do conjunto de features.
     """
     __tablename__ = "ml_data"
 
     id = Column(Integer, primary_key=True, index=True)
-    book_id = Column(Integer) #FK
+    book_id = Column(Integer, unique=True, index=True) #FK
+    feature_version = Column(Integer, nullable=False, index=True)
     price = Column(Float)
     rating_numeric = Column(Integer)
     availability_numeric = Column(Integer)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from . import ml_services as services
 from . import ml_schemas as schemas
-from ..database import get_db
+from ..database import get_read_db, run_db
 from ..auth import verify_token
+from ..http_cache import conditional_response
+from ..streaming import ExportFormat, export_response
 
 router = APIRouter(
     prefix="/api/v1/ml",
@@ -17,13 +19,22 @@ router = APIRouter(
     summary="Processa e retorna features básicas",
     dependencies=[Depends(verify_token)]
 )
-def get_features(db: Session = Depends(get_db)):
+async def get_features(
+    request: Request,
+    filters: services.FeatureFilters = Depends(),
+    db: Session = Depends(get_read_db)
+):
     """
     (Rota Protegida) 
-    Processa dados da tabela 'books', cria features numéricas
-    e retorna o resultado diretamente, sem salvar no banco.
+    Retorna as features numéricas dos livros, pré-calculadas na ingestão
+    (feature store 'ml_data') e serializadas de forma vetorizada
+    (o `response_model` documenta o formato).
+    - Filtre por versão do conjunto de features (`version`) e por intervalo de `book_id`.
     """
-    return services.process_and_return_features(db)
+    return await conditional_response(
+        request, "ml",
+        lambda: run_db(db, services.process_and_return_features, filters)
+    )
 
 @router.get(
     "/training-data", 
@@ -31,14 +42,33 @@ def get_features(db: Session = Depends(get_db)):
     summary="Dataset pré-processado para treinamento",
     dependencies=[Depends(verify_token)]
 )
-def get_training_data_route(db: Session = Depends(get_db)):
+async def get_training_data_route(
+    request: Request,
+    filters: services.FeatureFilters = Depends(),
+    output_format: ExportFormat = Query(ExportFormat.json, alias="format", description="Formato da resposta. `ndjson` e `csv` enviam o dataset via streaming; `parquet` e `arrow` (Arrow IPC) em formato colunar binário."),
+    db: Session = Depends(get_read_db)
+):
     """
     (Rota Protegida) 
     Retorna os dados com engenharia de features inicial,
-    prontos para serem usados em pipelines de treinamento.
+    prontos para serem usados em pipelines de treinamento, lidos do feature store.
+    Aceita os mesmos filtros de `/features` (`version`, `book_id_min`, `book_id_max`).
+    Com `format=ndjson` ou `format=csv`, o dataset é enviado em streaming, lote a lote.
+    Com `format=parquet` ou `format=arrow`, o dataset é enviado em formato colunar binário,
+    que pode ser carregado diretamente pelo pandas / pyarrow sem parsing de JSON.
     """
-    dataset = services.get_training_data(db)
-    return {"training_dataset": dataset}
+    if output_format != ExportFormat.json:
+        return export_response(
+            services.get_training_data_export_statement(filters),
+            services.FEATURE_COLUMNS,
+            output_format,
+            filename="training-data",
+            column_types=services.FEATURE_TYPES
+        )
+    return await conditional_response(
+        request, "ml",
+        lambda: run_db(db, services.get_training_data, filters)
+    )
 
 @router.post(
     "/predictions", 
@@ -46,9 +76,41 @@ def get_training_data_route(db: Session = Depends(get_db)):
     summary="Endpoint para receber predições",
     dependencies=[Depends(verify_token)]
 )
-def create_prediction(request: schemas.PredictionRequestSchema):
+async def create_prediction(request: schemas.PredictionRequestSchema):
     """
     (Rota Protegida) 
-    Endpoint para receber dados de entrada e retornar uma predição simulada.
+    Endpoint para receber dados de entrada e retornar a predição do modelo de rating
+    (regressão logística treinada com o dataset de /training-data, mantida em memória).
+    Requisições concorrentes são agrupadas em micro-lotes e avaliadas juntas pelo modelo.
     """
-    return services.make_prediction(request)
\ No newline at end of file
+    return await services.predict(request)
+
+@router.post(
+    "/predictions/batch",
+    response_model=schemas.BatchPredictionResponseSchema,
+    summary="Predições em lote",
+    dependencies=[Depends(verify_token)]
+)
+async def create_batch_prediction(request: schemas.BatchPredictionRequestSchema):
+    """
+    (Rota Protegida)
+    Recebe até milhares de itens em uma única requisição e os avalia em uma chamada
+    vetorizada do modelo. As predições retornam na mesma ordem dos itens enviados.
+    """
+    await services.ensure_model_loaded()
+    return Response(content=services.make_batch_prediction(request.items), media_type="application/json")
+
+@router.get(
+    "/predictions/stats",
+    response_model=schemas.PredictionBatchingStatsSchema,
+    summary="Métricas do micro-batching de predições",
+    tags=["Monitoring"],
+    dependencies=[Depends(verify_token)]
+)
+def get_prediction_stats():
+    """
+    (Rota Protegida)
+    Retorna o tamanho dos lotes formados pelo micro-batching (média, maior e histograma)
+    e o tempo de espera das requisições na fila.
+    """
+    return services.get_prediction_batching_stats()
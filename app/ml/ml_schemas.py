@@ -1,5 +1,9 @@
-from pydantic import BaseModel 
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any
+import os
+
+# Quantidade máxima de itens por requisição de predição em lote
+PREDICTION_BATCH_MAX_ITEMS = int(os.getenv("PREDICTION_BATCH_MAX_ITEMS", "10000"))
 
 class BookFeatureSchema(BaseModel):
     """
@@ -11,6 +15,7 @@ class BookFeatureSchema(BaseModel):
     rating_numeric: int
     availability_numeric: int
     category: str # A categoria é retornada como string
+    feature_version: int # Versão do conjunto de features que gerou a linha
 
     class Config:
         from_attributes = True
@@ -34,4 +39,31 @@ class PredictionResponseSchema(BaseModel):
     Schema para a resposta da predição.
     """
     predicted_rating: str
-    confidence_score: float
\ No newline at end of file
+    confidence_score: float
+
+class BatchPredictionRequestSchema(BaseModel):
+    """
+    Schema para a requisição de predição em lote.
+    """
+    items: List[PredictionRequestSchema] = Field(..., min_length=1, max_length=PREDICTION_BATCH_MAX_ITEMS)
+
+class BatchPredictionResponseSchema(BaseModel):
+    """
+    Schema para a resposta da predição em lote (na mesma ordem dos itens enviados).
+    """
+    predictions: List[PredictionResponseSchema]
+
+class PredictionBatchingStatsSchema(BaseModel):
+    """
+    Schema com as métricas do micro-batching das predições individuais.
+    """
+    enabled: bool
+    window_ms: float
+    max_batch_size: int
+    batches: int
+    items: int
+    avg_batch_size: float
+    largest_batch: int
+    batch_size_histogram: Dict[str, int]
+    avg_queue_wait_ms: float
+    max_queue_wait_ms: float
@@ -1,71 +1,190 @@
 from sqlalchemy.orm import Session
-from fastapi import HTTPException
+from sqlalchemy import select
+from fastapi import HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 import re
 import logging
-from typing import List, Dict, Any
-import pandas as pd
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import orjson
 from .. import models
 from . import ml_schemas as schemas
-from . import ml_models
+from . import batching, ml_models
 
-def process_and_return_features(db: Session) -> List[schemas.BookFeatureSchema]:
+# pandas, NumPy e o modelo são importados apenas quando uma rota de ML é usada (inicialização mais rápida)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Mapeamento do rating textual para numérico
+RATING_MAP = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
+AVAILABILITY_PATTERN = re.compile(r'(\d+)')
+
+# Versão do conjunto de features: incremente ao mudar as regras de cálculo,
+# para que as linhas do feature store sejam recalculadas na próxima inicialização
+FEATURE_SET_VERSION = 1
+
+# Colunas do dataset de features (na ordem em que são exportadas) e seus tipos
+FEATURE_TYPES = {
+    'id': int,
+    'book_id': int,
+    'price': float,
+    'rating_numeric': int,
+    'availability_numeric': int,
+    'category': str,
+    'feature_version': int
+}
+FEATURE_COLUMNS = list(FEATURE_TYPES)
+
+class FeatureFilters:
+    """
+    Filtros de leitura do feature store, recebidos como parâmetros de query nas rotas de ML.
+    """
+    def __init__(
+        self,
+        version: Optional[int] = Query(None, ge=1, description="Retorna apenas as linhas geradas por esta versão do conjunto de features."),
+        book_id_min: Optional[int] = Query(None, ge=1, description="Menor `book_id` retornado (inclusive)."),
+        book_id_max: Optional[int] = Query(None, ge=1, description="Maior `book_id` retornado (inclusive)."),
+    ):
+        self.version = version
+        self.book_id_min = book_id_min
+        self.book_id_max = book_id_max
+
+def get_books_source_statement():
+    """
+    Monta o SELECT com as colunas brutas da tabela 'books' necessárias para calcular as features.
     """
-    Processa os dados da tabela 'books', cria features numéricas e
-    retorna o resultado diretamente, sem salvar no banco de dados.
+    return select(
+        models.Book.id,
+        models.Book.price,
+        models.Book.rating,
+        models.Book.availability,
+        models.Book.category
+    ).order_by(models.Book.id)
+
+def compute_features(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Calcula as features com operações vetorizadas sobre as colunas lidas por
+    `get_books_source_statement`, carimbando cada linha com `FEATURE_SET_VERSION`.
     """
-    logging.info("Iniciando o processo de criação de features em memória...")
-    
-    all_books = db.query(models.Book).all()
-    if not all_books:
-        raise HTTPException(status_code=404, detail="Nenhum livro encontrado na tabela 'books' para processar.")
+    import pandas as pd
+    return pd.DataFrame({
+        'id': df['id'].astype('int64'),
+        'book_id': df['id'].astype('int64'),
+        'price': df['price'].astype('float64'),
+        'rating_numeric': df['rating'].map(RATING_MAP).fillna(0).astype('int64'),
+        'availability_numeric': df['availability'].str.extract(AVAILABILITY_PATTERN, expand=False).fillna(0).astype('int64'),
+        'category': df['category'].astype(str),
+        'feature_version': FEATURE_SET_VERSION
+    }, columns=FEATURE_COLUMNS)
 
-    df = pd.DataFrame([book.__dict__ for book in all_books])
+def get_training_data_export_statement(filters: Optional[FeatureFilters] = None):
+    """
+    Monta o SELECT das features pré-calculadas (tabela 'ml_data'), com os filtros
+    de versão e de intervalo de `book_id`. Usado na leitura e no modo de exportação.
+    """
+    feature = ml_models.BookFeature
+    statement = select(*[getattr(feature, column) for column in FEATURE_COLUMNS]).order_by(feature.book_id)
+    if filters is not None:
+        if filters.version is not None:
+            statement = statement.where(feature.feature_version == filters.version)
+        if filters.book_id_min is not None:
+            statement = statement.where(feature.book_id >= filters.book_id_min)
+        if filters.book_id_max is not None:
+            statement = statement.where(feature.book_id <= filters.book_id_max)
+    return statement
 
-    rating_map = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
-    df['rating_numeric'] = df['rating'].map(rating_map).fillna(0).astype(int)
-    
-    df['availability_numeric'] = df['availability'].str.extract(r'(\d+)', expand=False).fillna(0).astype(int)
+def features_to_json(features: "pd.DataFrame") -> bytes:
+    """
+    Serializa as features em uma lista JSON diretamente a partir dos arrays das colunas,
+    sem criar um `BookFeatureSchema` por linha.
+    """
+    columns = [features[column].tolist() for column in FEATURE_COLUMNS]
+    return orjson.dumps([dict(zip(FEATURE_COLUMNS, values)) for values in zip(*columns)])
 
-    # Prepara a lista de features para retornar
-    feature_list = []
-    for _, row in df.iterrows():
-        feature_list.append(schemas.BookFeatureSchema(
-            id=int(row['id']), # Usamos o ID original do livro
-            book_id=int(row['id']),
-            price=float(row['price']),
-            rating_numeric=int(row['rating_numeric']),
-            availability_numeric=int(row['availability_numeric']),
-            category=str(row['category'])
-        ))
-    
-    logging.info(f"{len(feature_list)} registros de features processados em memória.")
-    return feature_list
+def process_and_return_features(db: Session, filters: Optional[FeatureFilters] = None) -> bytes:
+    """
+    Lê as features pré-calculadas do feature store (tabela 'ml_data'), que é mantido
+    na ingestão, e as retorna como JSON já serializado.
+    """
+    import pandas as pd
+    features = pd.read_sql(get_training_data_export_statement(filters), db.connection())
+    if features.empty:
+        raise HTTPException(status_code=404, detail="Nenhuma feature encontrada no feature store para os filtros informados.")
+    logging.info(f"{len(features)} registros de features lidos do feature store.")
+    return features_to_json(features)
 
-def get_training_data(db: Session) -> List[schemas.BookFeatureSchema]:
+def get_training_data(db: Session, filters: Optional[FeatureFilters] = None) -> bytes:
     """
-    Processa as features da mesma forma que o endpoint /features e as retorna.
-    Esta função agora atua como um alias para manter a consistência do endpoint.
+    Retorna as features da mesma forma que o endpoint /features,
+    no formato da resposta de /training-data (JSON já serializado).
     """
-    logging.info("Chamando a lógica de processamento de features para o dataset de treinamento...")
-    return process_and_return_features(db)
+    logging.info("Chamando a lógica de leitura de features para o dataset de treinamento...")
+    return b'{"training_dataset":' + process_and_return_features(db, filters) + b'}'
+
+def _predict(items: List[schemas.PredictionRequestSchema]):
+    """ Executa o modelo carregado em memória sobre todos os itens de uma vez. """
+    import numpy as np
+    from . import rating_model
+    model = rating_model.get_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail="Modelo de rating indisponível. Verifique se há dados no feature store.")
+    return model.predict(
+        np.fromiter((item.price for item in items), dtype='float64', count=len(items)),
+        np.fromiter((item.availability_numeric for item in items), dtype='float64', count=len(items)),
+        [item.category for item in items]
+    )
 
 def make_prediction(request_data: schemas.PredictionRequestSchema) -> schemas.PredictionResponseSchema:
     """
-    Simula uma predição com base nos dados de entrada.
+    Prevê o rating de um livro com o modelo treinado, mantido em memória.
     """
     logging.info(f"Recebida requisição de predição: {request_data}")
-    
-    if request_data.price > 50.00:
-        predicted_rating = "Five"
-        confidence = 0.95
-    elif request_data.category == "Mystery":
-        predicted_rating = "Four"
-        confidence = 0.88
-    else:
-        predicted_rating = "Three"
-        confidence = 0.75
-
+    labels, confidences = _predict([request_data])
     return schemas.PredictionResponseSchema(
-        predicted_rating=predicted_rating,
-        confidence_score=confidence
-    )
\ No newline at end of file
+        predicted_rating=str(labels[0]),
+        confidence_score=round(float(confidences[0]), 4)
+    )
+
+def _predict_responses(items: List[schemas.PredictionRequestSchema]) -> List[Dict[str, Any]]:
+    labels, confidences = _predict(items)
+    return [
+        {"predicted_rating": label, "confidence_score": confidence}
+        for label, confidence in zip(labels.tolist(), confidences.round(4).tolist())
+    ]
+
+# Agrupa as predições individuais concorrentes em lotes para o modelo
+prediction_batcher = batching.MicroBatcher(_predict_responses)
+
+def _load_model() -> None:
+    from . import rating_model
+    rating_model.get_model()
+
+async def ensure_model_loaded() -> None:
+    """
+    Carrega o modelo (importando NumPy e, se configurado, treinando-o) no threadpool, uma única vez,
+    antes da primeira predição. Assim, o carregamento tardio da inicialização rápida não bloqueia o
+    event loop; as predições em si continuam no loop, pois o modelo já está em memória.
+    """
+    from . import rating_model
+    if not rating_model.is_loaded():
+        await run_in_threadpool(_load_model)
+
+async def predict(request_data: schemas.PredictionRequestSchema) -> Dict[str, Any]:
+    """
+    Prevê o rating de um livro. Com `PREDICTION_MICRO_BATCHING` ativo, a requisição é agrupada
+    com as demais que chegarem na mesma janela e avaliada em uma única chamada do modelo.
+    """
+    await ensure_model_loaded()
+    if not batching.PREDICTION_MICRO_BATCHING:
+        return make_prediction(request_data).model_dump()
+    return await prediction_batcher.submit(request_data)
+
+def get_prediction_batching_stats() -> Dict[str, Any]:
+    return {"enabled": batching.PREDICTION_MICRO_BATCHING, **prediction_batcher.get_stats()}
+
+def make_batch_prediction(items: List[schemas.PredictionRequestSchema]) -> bytes:
+    """
+    Prevê o rating de todos os itens em uma única chamada vetorizada do modelo
+    e serializa a resposta diretamente a partir dos arrays de resultado.
+    """
+    logging.info(f"Predição em lote: {len(items)} itens.")
+    return orjson.dumps({"predictions": _predict_responses(items)})
@@ -0,0 +1,211 @@
+from datetime import datetime, timezone
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Sequence, Tuple
+import argparse
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+from . import ml_services
+from ..startup import FAST_START
+
+# Configurações do modelo de rating
+MODEL_PATH = os.getenv("RATING_MODEL_PATH", os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'rating_model.npz'))
+# Treino na inicialização: "missing" (só sem artefato válido), "always" ou "never".
+# Na inicialização rápida (FAST_START), o padrão é "never": usa o artefato publicado em data/
+MODEL_TRAIN_ON_STARTUP = os.getenv("MODEL_TRAIN_ON_STARTUP", "never" if FAST_START else "missing").lower()
+MODEL_EPOCHS = int(os.getenv("MODEL_EPOCHS", "500"))
+MODEL_LEARNING_RATE = float(os.getenv("MODEL_LEARNING_RATE", "0.5"))
+MODEL_L2 = float(os.getenv("MODEL_L2", "0.001"))
+
+# Classes previstas, na ordem do rating numérico
+RATING_LABELS = np.array(['One', 'Two', 'Three', 'Four', 'Five'])
+
+
+class RatingModel:
+    """
+    Regressão logística multinomial (softmax) que prevê o rating a partir de
+    preço, disponibilidade (padronizados) e categoria (one-hot). Implementada com NumPy:
+    a predição de um lote inteiro é uma única multiplicação de matrizes.
+    """
+    def __init__(self, categories: np.ndarray, mean: np.ndarray, std: np.ndarray, weights: np.ndarray,
+                 bias: np.ndarray, feature_version: int, trained_at: str):
+        self.categories = categories
+        self.category_index = {category: position for position, category in enumerate(categories.tolist())}
+        self.mean = mean
+        self.std = std
+        self.weights = weights
+        self.bias = bias
+        self.feature_version = feature_version
+        self.trained_at = trained_at
+
+    def _design_matrix(self, price: np.ndarray, availability: np.ndarray, category: Sequence[str]) -> np.ndarray:
+        numeric = (np.column_stack([price, availability]).astype('float64') - self.mean) / self.std
+        one_hot = np.zeros((len(numeric), len(self.categories)))
+        # Categorias desconhecidas ficam sem coluna ativa (apenas preço e disponibilidade contam)
+        positions = np.array([self.category_index.get(value, -1) for value in category], dtype='int64')
+        known = positions >= 0
+        one_hot[np.flatnonzero(known), positions[known]] = 1.0
+        return np.hstack([numeric, one_hot])
+
+    def predict_proba(self, price, availability, category) -> np.ndarray:
+        logits = self._design_matrix(price, availability, category) @ self.weights + self.bias
+        return _softmax(logits)
+
+    def predict(self, price, availability, category) -> Tuple[np.ndarray, np.ndarray]:
+        """ Retorna os ratings previstos e a confiança (probabilidade da classe prevista). """
+        probabilities = self.predict_proba(price, availability, category)
+        best = probabilities.argmax(axis=1)
+        return RATING_LABELS[best], probabilities[np.arange(len(best)), best]
+
+    @classmethod
+    def train(cls, features: pd.DataFrame, epochs: int = MODEL_EPOCHS, learning_rate: float = MODEL_LEARNING_RATE,
+              l2: float = MODEL_L2) -> "RatingModel":
+        """
+        Treina o modelo com gradiente descendente (lote completo) sobre as features do
+        feature store. Linhas sem rating válido (`rating_numeric` = 0) são ignoradas.
+        """
+        features = features[features['rating_numeric'].between(1, len(RATING_LABELS))]
+        if features.empty:
+            raise ValueError("Não há linhas com rating válido para treinar o modelo.")
+        numeric = features[['price', 'availability_numeric']].to_numpy(dtype='float64')
+        std = numeric.std(axis=0)
+        model = cls(
+            categories=np.array(sorted(features['category'].unique())),
+            mean=numeric.mean(axis=0),
+            std=np.where(std > 0, std, 1.0),
+            weights=np.zeros((2 + features['category'].nunique(), len(RATING_LABELS))),
+            bias=np.zeros(len(RATING_LABELS)),
+            feature_version=ml_services.FEATURE_SET_VERSION,
+            trained_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        )
+        x = model._design_matrix(features['price'].to_numpy(), features['availability_numeric'].to_numpy(), features['category'].tolist())
+        targets = np.eye(len(RATING_LABELS))[features['rating_numeric'].to_numpy() - 1]
+        for _ in range(epochs):
+            error = _softmax(x @ model.weights + model.bias) - targets
+            model.weights -= learning_rate * (x.T @ error / len(x) + l2 * model.weights)
+            model.bias -= learning_rate * error.mean(axis=0)
+        return model
+
+    def accuracy(self, features: pd.DataFrame) -> float:
+        labels, _ = self.predict(features['price'].to_numpy(), features['availability_numeric'].to_numpy(), features['category'].tolist())
+        return float((labels == RATING_LABELS[features['rating_numeric'].to_numpy() - 1]).mean())
+
+    def save(self, path: str = MODEL_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as artifact:
+            np.savez(
+                artifact, categories=self.categories, mean=self.mean, std=self.std, weights=self.weights,
+                bias=self.bias, feature_version=self.feature_version, trained_at=self.trained_at,
+            )
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "RatingModel":
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls(
+                categories=artifact['categories'], mean=artifact['mean'], std=artifact['std'],
+                weights=artifact['weights'], bias=artifact['bias'],
+                feature_version=int(artifact['feature_version']), trained_at=str(artifact['trained_at']),
+            )
+
+    def info(self) -> Dict:
+        return {"feature_version": self.feature_version, "trained_at": self.trained_at, "categories": len(self.categories)}
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+_model: Optional[RatingModel] = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def get_model() -> Optional[RatingModel]:
+    """
+    Modelo carregado em memória (ou None, se não houver). Se ainda não foi carregado
+    (inicialização rápida), é carregado na primeira chamada; uma falha também fica registrada
+    e não é repetida. Chame fora do event loop (ver `ml_services.ensure_model_loaded`).
+    """
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                load_model()
+    return _model
+
+
+def is_loaded() -> bool:
+    """ Indica se o carregamento já foi tentado (com ou sem sucesso). """
+    return _loaded
+
+
+def train_from_feature_store(db: Session, path: str = MODEL_PATH) -> RatingModel:
+    """
+    Treina o modelo com o dataset de treinamento do feature store e salva o artefato.
+    Se o artefato não puder ser gravado (ex.: sistema de arquivos somente leitura), o modelo
+    treinado continua sendo retornado e usado em memória.
+    """
+    features = pd.read_sql(ml_services.get_training_data_export_statement(), db.connection())
+    model = RatingModel.train(features)
+    try:
+        model.save(path)
+    except OSError as e:
+        logging.warning(f"Não foi possível salvar o artefato do modelo de rating em {path}: {e}. O modelo será mantido apenas em memória.")
+    logging.info(f"Modelo de rating treinado com {len(features)} livros (acurácia no treino: {model.accuracy(features):.3f}).")
+    return model
+
+
+def load_model(path: str = MODEL_PATH) -> Optional[RatingModel]:
+    """
+    Carrega o artefato do modelo uma única vez (na inicialização) e o mantém em memória.
+    Conforme `MODEL_TRAIN_ON_STARTUP`, treina um novo modelo a partir do feature store quando
+    não há artefato, quando ele foi gerado com outra versão de features ou sempre.
+    """
+    global _model, _loaded
+    model = None
+    if MODEL_TRAIN_ON_STARTUP != "always" and os.path.exists(path):
+        try:
+            model = RatingModel.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Não foi possível ler o artefato do modelo de rating em {path}: {e}")
+        if model is not None and model.feature_version != ml_services.FEATURE_SET_VERSION and MODEL_TRAIN_ON_STARTUP != "never":
+            logging.info("O modelo de rating foi treinado com outra versão de features. Treinando novamente...")
+            model = None
+    if model is None and MODEL_TRAIN_ON_STARTUP != "never":
+        from ..database import SessionLocal
+        db = SessionLocal()
+        try:
+            model = train_from_feature_store(db, path)
+        except (ValueError, SQLAlchemyError) as e:
+            logging.warning(f"Não foi possível treinar o modelo de rating: {e}")
+        finally:
+            db.close()
+    _model, _loaded = model, True
+    if model is None:
+        logging.warning("Nenhum modelo de rating carregado. As rotas de predição responderão 503.")
+    else:
+        logging.info(f"Modelo de rating carregado em memória: {model.info()}.")
+    return model
+
+
+def main():
+    """ Treina o modelo pela linha de comando: `python -m app.ml.rating_model [--output caminho.npz]`. """
+    parser = argparse.ArgumentParser(description="Treina o modelo de rating a partir do feature store.")
+    parser.add_argument('--output', default=MODEL_PATH, help="Caminho do artefato (padrão: data/rating_model.npz).")
+    args = parser.parse_args()
+
+    from ..main import engine  # Cria as tabelas e aplica as migrações
+    from ..database import SessionLocal, check_and_populate_db
+    check_and_populate_db()
+    db = SessionLocal()
+    try:
+        train_from_feature_store(db, args.output)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,3 +11,53 @@ class Book(Base):
     availability = Column(String)
     category = Column(String, index=True)
     image_url = Column(String)
+    source_key = Column(String, unique=True, index=True)  # Identificador estável usado nas cargas incrementais
+
+
+class OverviewStats(Base):
+    """
+    Estatísticas gerais da coleção, pré-calculadas na ingestão (linha única, id = 1).
+    """
+    __tablename__ = "stats_overview"
+
+    id = Column(Integer, primary_key=True)
+    total_books = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0.0)
+
+
+class RatingStats(Base):
+    """
+    Quantidade de livros por rating, pré-calculada na ingestão.
+    """
+    __tablename__ = "stats_rating"
+
+    rating = Column(String, primary_key=True)
+    book_count = Column(Integer, nullable=False, default=0)
+
+
+class CategoryStats(Base):
+    """
+    Agregados por categoria, pré-calculados na ingestão.
+    As médias são derivadas das somas no momento da leitura.
+    """
+    __tablename__ = "stats_category"
+
+    category = Column(String, primary_key=True)
+    book_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0.0)
+    min_price = Column(Float)
+    max_price = Column(Float)
+    rating_sum = Column(Integer, nullable=False, default=0)
+
+
+class SchemaMarker(Base):
+    """
+    Marcador gravado após uma inicialização completa: versão do esquema (e das features) aplicada
+    ao banco e backend da busca textual. Na inicialização rápida, se confere, as verificações são puladas.
+    """
+    __tablename__ = "schema_marker"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    search_backend = Column(String)
+    applied_at = Column(String)
@@ -0,0 +1,137 @@
+from fastapi import HTTPException, Query, status
+from sqlalchemy import tuple_
+from typing import Any, Dict, List, Optional, Sequence
+import base64
+import json
+import os
+from . import models, schemas
+
+# Configurações de paginação
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+
+# Campos públicos do livro, que podem ser solicitados via `fields=` (a 'source_key' é interna)
+BOOK_FIELDS = tuple(schemas.BookSchema.model_fields)
+
+# Header usado para devolver o cursor da próxima página
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Tipos aceitos em cada valor do cursor (os das chaves de ordenação: id, score, ...)
+CURSOR_VALUE_TYPES = (int, float, str)
+
+
+class PageParams:
+    """
+    Dependência com os parâmetros de paginação por cursor (keyset) e projeção de campos.
+    """
+    def __init__(
+        self,
+        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX, description="Quantidade máxima de itens por página."),
+        cursor: Optional[str] = Query(None, description=f"Cursor opaco retornado no header `{NEXT_CURSOR_HEADER}` da página anterior."),
+        fields: Optional[str] = Query(None, description="Lista de campos separados por vírgula (ex.: `title,price`). O `id` é sempre retornado."),
+    ):
+        self.limit = limit
+        self.cursor = decode_cursor(cursor)
+        self.fields = parse_fields(fields)
+        self.next_cursor: Optional[str] = None
+
+
+def encode_cursor(*values: Any) -> str:
+    """ Codifica os valores da chave de ordenação em um cursor opaco. """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[list]:
+    """
+    Decodifica um cursor gerado por `encode_cursor`.
+    - Lança um erro 400 se o cursor for inválido: precisa ser uma lista não vazia de números ou textos.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or not values:
+            raise ValueError
+        if any(isinstance(value, bool) or not isinstance(value, CURSOR_VALUE_TYPES) for value in values):
+            raise ValueError
+        return values
+    except ValueError:
+        raise _invalid_cursor()
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+
+
+def _matches_key(value: Any, key) -> bool:
+    """ Indica se o valor do cursor tem o tipo da coluna da chave de ordenação (int aceito em colunas float). """
+    try:
+        python_type = key.type.python_type
+    except NotImplementedError:
+        return True
+    if python_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Converte o parâmetro `fields` em uma lista de colunas válidas.
+    - O `id` é sempre incluído, pois é a chave usada na paginação.
+    - Lança um erro 400 se algum campo não existir.
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    invalid = [field for field in requested if field not in BOOK_FIELDS]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos inválidos: {', '.join(invalid)}. Campos disponíveis: {', '.join(BOOK_FIELDS)}."
+        )
+    return ["id"] + [field for field in BOOK_FIELDS if field in requested and field != "id"]
+
+
+def book_query(db, fields: Optional[Sequence[str]]):
+    """
+    Cria a query de livros selecionando apenas as colunas pedidas (ou todas).
+    Seleciona colunas, e não a entidade `Book`, para evitar montar objetos ORM por linha.
+    """
+    return db.query(*[getattr(models.Book, field) for field in fields or BOOK_FIELDS])
+
+
+def paginate(query, page: PageParams, keys: Sequence = (models.Book.id,)) -> list:
+    """
+    Aplica a paginação por keyset na query.
+    As linhas são ordenadas por `keys` e filtradas para valores maiores que o cursor.
+    Quando a página vem completa, o cursor da próxima página é guardado em `page.next_cursor`.
+    Lança um erro 400 se o cursor não corresponder às chaves (quantidade ou tipo dos valores).
+    As linhas (tuplas com as colunas de `book_query`) são convertidas em dicionários.
+    """
+    if page.cursor is not None:
+        # Um cursor de outro endpoint (outra chave de ordenação) ou adulterado não chega ao banco
+        if len(page.cursor) != len(keys) or not all(_matches_key(value, key) for value, key in zip(page.cursor, keys)):
+            raise _invalid_cursor()
+        if len(keys) == 1:
+            query = query.filter(keys[0] > page.cursor[0])
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(*page.cursor))
+
+    # As chaves de ordenação são selecionadas junto para montar o próximo cursor
+    cursor_columns = [key.label(f"cursor_{i}") for i, key in enumerate(keys)]
+    rows = query.add_columns(*cursor_columns).order_by(*keys).limit(page.limit).all()
+    if len(rows) == page.limit:
+        page.next_cursor = encode_cursor(*rows[-1][-len(keys):])
+    fields = page.fields or BOOK_FIELDS
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def cursor_headers(page: PageParams) -> Dict[str, str]:
+    """
+    Retorna o header com o cursor da próxima página, se houver.
+    """
+    if page.next_cursor:
+        return {NEXT_CURSOR_HEADER: page.next_cursor}
+    return {}
@@ -0,0 +1,297 @@
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from jose import JWTError
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import time
+from . import schemas
+from .auth import decode_token, verify_token
+
+# Configurações do profiler de consultas
+# Ativo para todas as requisições (e para as consultas fora delas, como a ingestão)
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+# Ativação por requisição, com o header `X-Profile: 1` (aceito apenas com um token Bearer válido)
+PROFILER_ALLOW_HEADER = os.getenv("PROFILER_ALLOW_HEADER", "false").lower() == "true"
+PROFILER_HEADER = "x-profile"
+PROFILER_SLOW_QUERY_MS = float(os.getenv("PROFILER_SLOW_QUERY_MS", "50"))
+PROFILER_EXPLAIN = os.getenv("PROFILER_EXPLAIN", "true").lower() == "true"
+# Quantidade de execuções do mesmo comando, em uma requisição, a partir da qual ele é sinalizado (possível N+1)
+PROFILER_REPEAT_THRESHOLD = int(os.getenv("PROFILER_REPEAT_THRESHOLD", "3"))
+PROFILER_MAX_ENTRIES = int(os.getenv("PROFILER_MAX_ENTRIES", "200"))
+
+# Headers de resposta com o resumo das consultas da requisição perfilada
+QUERY_COUNT_HEADER = "X-Query-Count"
+QUERY_TIME_HEADER = "X-Query-Time-Ms"
+
+# Tamanho máximo dos textos guardados (comando SQL e parâmetros)
+MAX_TEXT_LENGTH = 2000
+
+_requests: deque = deque(maxlen=PROFILER_MAX_ENTRIES)
+_slow_queries: deque = deque(maxlen=PROFILER_MAX_ENTRIES)
+_lock = threading.Lock()
+
+
+class RequestProfile:
+    """ Consultas executadas durante uma requisição perfilada. """
+    def __init__(self, scope):
+        self.scope = scope
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        self.statements: Counter = Counter()
+        self.executions: Counter = Counter()  # Mesmo comando com os mesmos parâmetros
+        self.query_count = 0
+        self.query_time = 0.0
+        self.slow_queries: List[Dict] = []
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    def repeated_statements(self) -> List[Dict]:
+        """ Comandos executados `PROFILER_REPEAT_THRESHOLD` vezes ou mais (típico de N+1). """
+        repeated = []
+        for statement, count in self.statements.most_common():
+            if count < PROFILER_REPEAT_THRESHOLD:
+                break
+            duplicates = sum(times for (text, _), times in self.executions.items() if text == statement and times > 1)
+            repeated.append({"statement": statement[:MAX_TEXT_LENGTH], "count": count, "identical_executions": duplicates})
+        return repeated
+
+
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def _truncate(value) -> str:
+    text = repr(value)
+    return text if len(text) <= MAX_TEXT_LENGTH else text[:MAX_TEXT_LENGTH] + "..."
+
+
+def _explain(conn, statement: str, parameters) -> Optional[List[str]]:
+    """
+    Executa o plano da consulta (`EXPLAIN QUERY PLAN` no SQLite, `EXPLAIN` no Postgres)
+    em um cursor separado, com os mesmos parâmetros. Apenas para SELECTs.
+    """
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f"Não foi possível obter o plano: {e}"]
+    if dialect == "sqlite":
+        # Linhas: (id, parent, notused, detail)
+        return [str(row[-1]) for row in rows]
+    return [str(row[0]) for row in rows]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if PROFILER_ENABLED or _profile.get() is not None:
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile.get()
+    if not PROFILER_ENABLED and profile is None:
+        return
+    started = conn.info.get("profiler_started")
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+
+    if profile is not None:
+        profile.query_count += 1
+        profile.query_time += elapsed_ms
+        profile.statements[statement] += 1
+        if not executemany:
+            profile.executions[(statement, _truncate(parameters))] += 1
+
+    if elapsed_ms < PROFILER_SLOW_QUERY_MS:
+        return
+    route = profile.route if profile is not None else "none"
+    plan = None if executemany or not PROFILER_EXPLAIN else _explain(conn, statement, parameters)
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        "route": route,
+        "duration_ms": round(elapsed_ms, 3),
+        "statement": statement[:MAX_TEXT_LENGTH],
+        "parameters": _truncate(parameters),
+        "plan": plan,
+    }
+    with _lock:
+        _slow_queries.append(entry)
+    if profile is not None:
+        profile.slow_queries.append(entry)
+    plan_text = "\n    ".join(plan) if plan else "-"
+    logging.warning(f"Consulta lenta ({elapsed_ms:.1f} ms) em {route}: {statement}\n  Plano:\n    {plan_text}")
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    started = connection.info.get("profiler_started") if connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """ Registra os eventos do SQLAlchemy usados pelo profiler (custo mínimo quando desativado). """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _is_authenticated(headers: Dict[bytes, bytes]) -> bool:
+    scheme, _, token = headers.get(b"authorization", b"").decode().partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        decode_token(token)
+    except JWTError:
+        return False
+    return True
+
+
+def _profiling_requested(scope) -> bool:
+    if PROFILER_ENABLED:
+        return True
+    if not PROFILER_ALLOW_HEADER:
+        return False
+    headers = dict(scope.get("headers", ()))
+    if headers.get(PROFILER_HEADER.encode(), b"").decode().strip().lower() not in ("1", "true", "yes"):
+        return False
+    # O header só é aceito de clientes autenticados: o profiler executa EXPLAIN e guarda os comandos SQL
+    return _is_authenticated(headers)
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI que perfila as consultas SQL das requisições quando o profiler está ativo
+    (`PROFILER_ENABLED`) ou quando a requisição envia `X-Profile: 1` com um token Bearer válido
+    (com `PROFILER_ALLOW_HEADER=true`).
+    Registra o total de comandos, o tempo em SQL, as consultas lentas (com o plano) e os
+    comandos repetidos, e devolve `X-Query-Count` e `X-Query-Time-Ms` na resposta.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = _profile.set(profile)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (QUERY_COUNT_HEADER.lower().encode(), str(profile.query_count).encode()),
+                    (QUERY_TIME_HEADER.lower().encode(), f"{profile.query_time:.3f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(token)
+            _record(profile, scope, status_code, (time.perf_counter() - started) * 1000)
+
+
+def _record(profile: RequestProfile, scope, status_code: int, duration_ms: float) -> None:
+    repeated = profile.repeated_statements()
+    path = scope["path"] + (f"?{scope['query_string'].decode()}" if scope.get("query_string") else "")
+    with _lock:
+        _requests.append({
+            "timestamp": profile.started_at,
+            "method": scope["method"],
+            "path": path,
+            "route": profile.route,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "query_count": profile.query_count,
+            "query_time_ms": round(profile.query_time, 3),
+            "slow_queries": len(profile.slow_queries),
+            "repeated_statements": repeated,
+        })
+    for item in repeated:
+        logging.warning(
+            f"Possível N+1 em {scope['method']} {profile.route}: comando executado {item['count']} vezes "
+            f"na mesma requisição: {item['statement']}"
+        )
+
+
+def get_report(limit: int) -> Dict:
+    with _lock:
+        requests = list(_requests)[-limit:][::-1]
+        slow_queries = list(_slow_queries)[-limit:][::-1]
+    return {
+        "enabled": PROFILER_ENABLED,
+        "header_enabled": PROFILER_ALLOW_HEADER,
+        "slow_query_ms": PROFILER_SLOW_QUERY_MS,
+        "repeat_threshold": PROFILER_REPEAT_THRESHOLD,
+        "requests": requests,
+        "slow_queries": slow_queries,
+    }
+
+
+def clear() -> None:
+    with _lock:
+        _requests.clear()
+        _slow_queries.clear()
+
+
+router = APIRouter(prefix="/api/v1/debug")
+
+
+@router.get(
+    "/profiler",
+    response_model=schemas.ProfilerReportSchema,
+    summary="Relatório do profiler de consultas SQL",
+    tags=["Debug"],
+    dependencies=[Depends(verify_token)]
+)
+def get_profiler_report(limit: int = Query(50, ge=1, le=PROFILER_MAX_ENTRIES, description="Quantidade de itens mais recentes.")):
+    """
+    (Rota Protegida)
+    Retorna as requisições perfiladas (quantidade de comandos, tempo em SQL e comandos repetidos,
+    sinal de N+1) e as consultas acima de `PROFILER_SLOW_QUERY_MS`, com o plano de execução.
+    Ative com `PROFILER_ENABLED=true` ou, com `PROFILER_ALLOW_HEADER=true`, envie o header `X-Profile: 1`
+    (junto com o token Bearer) na requisição a perfilar.
+    """
+    return get_report(limit)
+
+
+@router.delete(
+    "/profiler",
+    status_code=204,
+    response_class=Response,
+    summary="Limpa o relatório do profiler",
+    tags=["Debug"],
+    dependencies=[Depends(verify_token)]
+)
+def clear_profiler_report():
+    """
+    (Rota Protegida)
+    Descarta as requisições e consultas lentas registradas pelo profiler.
+    """
+    clear()
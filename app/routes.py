@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException, Query, Header
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException, Query, Header
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from . import services, schemas
-from .database import get_db
+from . import cache, services, schemas, similarity, startup
+from .database import get_read_db, run_db
+from .http_cache import conditional_response
+from .pagination import BOOK_FIELDS, PageParams, cursor_headers
+from .streaming import ExportFormat, export_response
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from .auth import create_access_token, verify_token, FAKE_USER
+from .auth import create_access_token, decode_token, FAKE_USER
 import os
-from jose import jwt
-from .auth import SECRET_KEY, ALGORITHM
+from jose import JWTError
 
 # Cria um roteador para agrupar os endpoints de livros
 router = APIRouter(
@@ -36,76 +39,148 @@ def health_check(response: Response):
     return {"api_status": "ok", "database_status": "ok"}
 
 
+# Endpoint com os contadores do cache
+@router.get(
+    "/cache/stats",
+    response_model=schemas.CacheStatsSchema,
+    summary="Contadores de acerto/erro do cache em memória",
+    tags=["Monitoring"]
+)
+def get_cache_stats():
+    """
+    Retorna os contadores do cache de consultas (hits, misses, evictions) e a versão atual dos dados.
+    Útil para ajustar o tamanho do cache e os TTLs de cada consulta.
+    """
+    return cache.get_stats()
+
+
+# Endpoint com os tempos do cold start
+@router.get(
+    "/startup/stats",
+    response_model=schemas.StartupStatsSchema,
+    summary="Tempos de importação e inicialização da instância",
+    tags=["Monitoring"]
+)
+def get_startup_stats():
+    """
+    Retorna quanto a instância levou para importar a aplicação, preparar o esquema e executar a inicialização,
+    se as verificações de esquema e de dados foram puladas (inicialização rápida, `FAST_START`) e quais
+    módulos pesados (NumPy, pandas, pyarrow) já foram carregados.
+    """
+    return startup.get_timings()
+
+
 # ---- BOOKS
 
 # Endpoint para listar todos os livros 
 @router.get(
     "/books",
-    response_model=List[schemas.BookSchema],
-    summary="Lista todos os livros",
+    response_model=List[schemas.BookProjectionSchema],
+    response_model_exclude_unset=True,
+    summary="Lista todos os livros (paginado)",
     tags=["Books"] 
 )
-def list_books(db: Session = Depends(get_db)):
+async def list_books(
+    request: Request,
+    page: PageParams = Depends(),
+    output_format: ExportFormat = Query(ExportFormat.json, alias="format", description="Formato da resposta. `ndjson`, `csv`, `parquet` e `arrow` exportam todos os livros via streaming."),
+    db: Session = Depends(get_read_db)
+):
     """
-    Retorna uma lista de TODOS os livros disponíveis na base de dados.
+    Retorna uma página dos livros disponíveis na base de dados.
+    - A paginação é feita por cursor: envie o valor do header `X-Next-Cursor` no parâmetro `cursor` para obter a próxima página.
+    - Use `fields` para retornar apenas algumas colunas.
+    - Com `format=ndjson`, `csv`, `parquet` ou `arrow`, todos os livros são enviados em streaming, sem paginação.
+    - Suporta requisições condicionais com `If-None-Match` (responde 304 se nada mudou).
     """
-    books = services.get_all_books(db)
-    return books
+    if output_format != ExportFormat.json:
+        statement = services.get_books_export_statement(page.fields)
+        return export_response(statement, page.fields or BOOK_FIELDS, output_format, filename="books")
+    return await conditional_response(
+        request, "books",
+        lambda: run_db(db, services.get_all_books, page),
+        headers=lambda: cursor_headers(page)
+    )
 
 
 # Endpoint para buscar livros por titulo e/ou categoria
 @router.get(
     "/books/search", 
-    response_model=List[schemas.BookSchema], 
+    response_model=List[schemas.BookProjectionSchema], 
+    response_model_exclude_unset=True,
     summary="Busca livros por título e/ou categoria",
     tags=["Books"]
 )
-def search_for_books(title: Optional[str] = None, category: Optional[str] = None, db: Session = Depends(get_db)):
+async def search_for_books(
+    request: Request,
+    title: Optional[str] = None,
+    category: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
+):
     """
     Busca livros que correspondam a um título e/ou categoria.
     - Pelo menos um dos parâmetros (`title` ou `category`) deve ser fornecido.
-    - A busca por título é por similaridade e não diferencia maiúsculas de minúsculas.
+    - A busca por título é textual: encontra títulos com todas as palavras informadas (inclusive por prefixo),
+      ignora acentos e maiúsculas/minúsculas e ordena os resultados por relevância.
     - A busca por categoria é exata.
+    - Suporta paginação por cursor e projeção de campos, assim como `/books`.
     """
     if not title and not category:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Forneça pelo menos um critério de busca: 'title' ou 'category'."
         )
-    return services.search_books(db, title=title, category=category)
+    return await conditional_response(
+        request, "books",
+        lambda: run_db(db, services.search_books, page, title=title, category=category),
+        headers=lambda: cursor_headers(page)
+    )
 
 
 # Endpoint para obter melhores livros por avaliação
 @router.get(
     "/books/top-rated", 
-    response_model=List[schemas.BookSchema], 
+    response_model=List[schemas.BookProjectionSchema], 
+    response_model_exclude_unset=True,
     summary="Lista os livros com melhor avaliação", 
     tags=["Books"]
 )
-def get_top_rated(db: Session = Depends(get_db)):
+async def get_top_rated(request: Request, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
     """ 
-    Retorna uma lista de livros com a avaliação máxima ('Five'). 
+    Retorna uma lista paginada de livros com a avaliação máxima ('Five'). 
     """
-    return services.get_top_rated_books(db)
+    return await conditional_response(
+        request, "books",
+        lambda: run_db(db, services.get_top_rated_books, page),
+        headers=lambda: cursor_headers(page)
+    )
 
 
 # Endpoint para obter livros por faixa de preço
 @router.get(
     "/books/price-range", 
-    response_model=List[schemas.BookSchema], 
+    response_model=List[schemas.BookProjectionSchema], 
+    response_model_exclude_unset=True,
     summary="Filtra livros por faixa de preço", 
     tags=["Books"])
-def get_by_price_range(
+async def get_by_price_range(
+    request: Request,
     min_price: float = Query(..., gt=0, description="Preço mínimo."),
     max_price: float = Query(..., gt=0, description="Preço máximo."),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
 ):
     """ 
-    Filtra livros cujo preço esteja entre `min_price` e `max_price`. 
+    Filtra livros cujo preço esteja entre `min_price` e `max_price`, com paginação por cursor. 
     """
     if min_price > max_price:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O preço mínimo não pode ser maior que o máximo.")
-    return services.get_books_by_price_range(db, min_price=min_price, max_price=max_price)
+    return await conditional_response(
+        request, "books",
+        lambda: run_db(db, services.get_books_by_price_range, page, min_price=min_price, max_price=max_price),
+        headers=lambda: cursor_headers(page)
+    )
 
 
 # Endpoint para obter detalhes de um livro específico pelo ID
@@ -115,11 +190,34 @@ def get_by_price_range(
     summary="Retorna um livro específico pelo ID",
     tags=["Books"]
 )
-def get_book_details(book_id: int, db: Session = Depends(get_db)):
+async def get_book_details(request: Request, book_id: int, db: Session = Depends(get_read_db)):
     """
     Retorna os detalhes completos de um livro específico com base no seu ID.
     """
-    return services.get_book_by_id(db, book_id=book_id)
+    return await conditional_response(
+        request, "books",
+        lambda: run_db(db, services.get_book_by_id, book_id=book_id)
+    )
+
+
+# Endpoint para obter os livros mais parecidos com um livro
+@router.get(
+    "/books/{book_id}/similar",
+    response_model=List[schemas.SimilarBookSchema],
+    summary="Retorna os livros mais parecidos com um livro",
+    tags=["Books"]
+)
+async def get_similar_books(
+    book_id: int,
+    k: int = Query(similarity.SIMILAR_DEFAULT_K, ge=1, le=similarity.SIMILAR_MAX_K, description="Quantidade de livros similares."),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Retorna os `k` livros mais parecidos com o livro informado (categoria, preço, rating,
+    disponibilidade e palavras do título), consultando um índice mantido em memória.
+    """
+    index = similarity.current_index() or await run_db(db, similarity.get_index)
+    return ORJSONResponse(similarity.get_similar_books(index, book_id, k))
 
 
 # --- CATEGORIES
@@ -131,12 +229,13 @@ def get_book_details(book_id: int, db: Session = Depends(get_db)):
     summary="Lista todas as categorias de livros",
     tags=["Categories"]
 )
-def list_categories(db: Session = Depends(get_db)):
+async def list_categories(request: Request, db: Session = Depends(get_read_db)):
     """
     Retorna uma lista com todas as categorias de livros únicas disponíveis.
     """
-    categories_list = services.get_all_categories(db)
-    return {"categories": categories_list}
+    async def produce():
+        return {"categories": await run_db(db, services.get_all_categories)}
+    return await conditional_response(request, "categories", produce)
 
 
 # --- ESTATISTICS
@@ -147,11 +246,14 @@ def list_categories(db: Session = Depends(get_db)):
     response_model=schemas.OverviewStatsSchema, 
     summary="Estatísticas gerais da coleção", 
     tags=["Statistics"])
-def get_overview_stats(db: Session = Depends(get_db)):
+async def get_overview_stats(request: Request, db: Session = Depends(get_read_db)):
     """
     Retorna estatísticas gerais, como total de livros, preço médio e distribuição de avaliações. 
     """
-    return services.get_general_stats(db)
+    return await conditional_response(
+        request, "stats",
+        lambda: run_db(db, services.get_general_stats)
+    )
 
 
 # Endpoint para obter estatísticas detalhadas por categoria
@@ -160,12 +262,13 @@ def get_overview_stats(db: Session = Depends(get_db)):
         response_model=schemas.CategoryStatsSchema, 
         summary="Estatísticas detalhadas por categoria", 
         tags=["Statistics"])
-def get_category_stats(db: Session = Depends(get_db)):
+async def get_category_stats(request: Request, db: Session = Depends(get_read_db)):
     """ 
     Retorna estatísticas detalhadas para cada categoria, como contagem de livros e faixa de preço. 
     """
-    stats_list = services.get_category_stats(db)
-    return {"stats": stats_list}
+    async def produce():
+        return {"stats": await run_db(db, services.get_category_stats)}
+    return await conditional_response(request, "stats", produce)
 
 # --- AUTHENTICATION
 
@@ -194,11 +297,12 @@ def refresh_token(authorization: str = Header(...)):
     Endpoint para renovar o token de acesso usando o token atual.
     O token deve ser passado no header Authorization como 'Bearer <token>'.
     """
-    token = authorization.split(" ")[1]
+    scheme, _, token = authorization.partition(" ")
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        new_access_token = create_access_token({"sub": username})
-        return {"access_token": new_access_token, "token_type": "bearer"}
-    except Exception:
-        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
\ No newline at end of file
+        if scheme.lower() != "bearer" or not token:
+            raise JWTError("Header Authorization malformado")
+        payload = decode_token(token)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+    new_access_token = create_access_token({"sub": payload["sub"]})
+    return {"access_token": new_access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class BookSchema(BaseModel):
     """ Schema para um único livro. """
@@ -15,6 +15,23 @@ class BookSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class BookProjectionSchema(BaseModel):
+    """ Schema para um livro com projeção de campos (`fields=`). Apenas os campos pedidos são retornados. """
+    id: int
+    title: Optional[str] = None
+    price: Optional[float] = None
+    rating: Optional[str] = None
+    availability: Optional[str] = None
+    category: Optional[str] = None
+    image_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class SimilarBookSchema(BookSchema):
+    """ Schema para um livro similar, com a distância até o livro consultado (menor é mais parecido). """
+    distance: float
+
 class CategoryListSchema(BaseModel):
     """ Schema para a lista de categorias de livros. """
     categories: List[str]
@@ -38,6 +55,65 @@ class CategoryStatsSchema(BaseModel):
     """ Schema para a lista de estatísticas de todas as categorias. """
     stats: List[CategoryStatItemSchema]
 
+class CacheStatsSchema(BaseModel):
+    """ Schema para os contadores do cache em memória. """
+    enabled: bool
+    data_version: int
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_ratio: float
+
+class StartupStatsSchema(BaseModel):
+    """ Schema com os tempos do cold start (importação e inicialização) da instância. """
+    fast_start: bool
+    schema_version: int
+    import_seconds: Optional[float] = None
+    schema_seconds: Optional[float] = None
+    startup_seconds: Optional[float] = None
+    schema_check: Optional[str] = None
+    data_check: Optional[str] = None
+    lazy_modules_loaded: List[str]
+
+class RepeatedStatementSchema(BaseModel):
+    """ Schema para um comando SQL repetido na mesma requisição (possível N+1). """
+    statement: str
+    count: int
+    identical_executions: int
+
+class ProfiledRequestSchema(BaseModel):
+    """ Schema para o resumo das consultas de uma requisição perfilada. """
+    timestamp: str
+    method: str
+    path: str
+    route: str
+    status: int
+    duration_ms: float
+    query_count: int
+    query_time_ms: float
+    slow_queries: int
+    repeated_statements: List[RepeatedStatementSchema]
+
+class SlowQuerySchema(BaseModel):
+    """ Schema para uma consulta lenta, com o plano de execução. """
+    timestamp: str
+    route: str
+    duration_ms: float
+    statement: str
+    parameters: str
+    plan: Optional[List[str]] = None
+
+class ProfilerReportSchema(BaseModel):
+    """ Schema para o relatório do profiler de consultas SQL. """
+    enabled: bool
+    header_enabled: bool
+    slow_query_ms: float
+    repeat_threshold: int
+    requests: List[ProfiledRequestSchema]
+    slow_queries: List[SlowQuerySchema]
+
 class TokenSchema(BaseModel):
     """ Schema para o token de autenticação. """
     access_token: str
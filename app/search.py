@@ -0,0 +1,145 @@
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from typing import List, Optional
+import logging
+import re
+from . import models
+
+# Backend de busca textual ativo: 'sqlite' (FTS5), 'postgresql' (tsvector/GIN) ou None (ILIKE)
+_backend: Optional[str] = None
+
+# Tabela virtual FTS5 com conteúdo externo: o texto continua apenas em 'books'.
+# O tokenizer unicode61 com remove_diacritics ignora acentos e maiúsculas/minúsculas.
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title,
+        content='books',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Triggers mantêm o índice sincronizado com qualquer escrita em 'books'
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO books_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+]
+
+# No Postgres o índice GIN é de expressão, mantido pelo próprio banco a cada escrita.
+# 'unaccent' não é IMMUTABLE, por isso é envolvido em uma função que pode ser indexada.
+POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION books_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_books_title_tsv ON books
+    USING GIN (to_tsvector('simple', books_unaccent(lower(title))))
+    """,
+]
+
+POSTGRES_DOCUMENT = "to_tsvector('simple', books_unaccent(lower(books.title)))"
+
+
+def setup_search_index(engine: Engine) -> None:
+    """
+    Cria (se necessário) o índice de busca textual para o banco configurado.
+    Se o banco não suportar busca textual, a busca por título volta a usar ILIKE.
+    """
+    global _backend
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'")
+                ).first()
+                for statement in SQLITE_SETUP:
+                    conn.execute(text(statement))
+                if not exists:
+                    # Indexa os livros que já estavam na tabela antes da criação do índice
+                    conn.execute(text("INSERT INTO books_fts(books_fts) VALUES ('rebuild')"))
+            elif dialect == "postgresql":
+                for statement in POSTGRES_SETUP:
+                    conn.execute(text(statement))
+            else:
+                logging.warning(f"Busca textual não suportada para o banco '{dialect}'. Usando ILIKE.")
+                return
+        _backend = dialect
+        logging.info(f"Índice de busca textual pronto ({dialect}).")
+    except SQLAlchemyError as e:
+        _backend = None
+        logging.warning(f"Não foi possível criar o índice de busca textual. Usando ILIKE. Erro: {e}")
+
+
+def is_enabled() -> bool:
+    """ Indica se a busca textual indexada está disponível. """
+    return _backend is not None
+
+
+def get_backend() -> Optional[str]:
+    return _backend
+
+
+def restore_backend(backend: Optional[str]) -> None:
+    """ Reativa o backend da última inicialização completa sem verificar o índice (inicialização rápida). """
+    global _backend
+    _backend = backend
+
+
+def _tokenize(term: str) -> List[str]:
+    return re.findall(r"\w+", term)
+
+
+def match_subquery(term: str):
+    """
+    Retorna uma subquery com as colunas `book_id` e `score` dos livros cujo título
+    contém todas as palavras de `term` (com correspondência por prefixo).
+    Quanto menor o `score`, mais relevante é o resultado.
+    Retorna None se o termo não tiver nenhuma palavra pesquisável.
+    """
+    tokens = _tokenize(term)
+    if not tokens:
+        return None
+
+    if _backend == "sqlite":
+        # Cada palavra vira uma string FTS5 entre aspas com '*' para busca por prefixo
+        fts_query = " ".join(f'"{token}"*' for token in tokens)
+        return (
+            select(
+                literal_column("books_fts.rowid").label("book_id"),
+                literal_column("bm25(books_fts)").label("score"),
+            )
+            .select_from(text("books_fts"))
+            .where(text("books_fts MATCH :fts_query").bindparams(fts_query=fts_query))
+            .subquery("matches")
+        )
+
+    # Postgres: ts_rank cresce com a relevância, então é negado para manter a ordem crescente
+    ts_query = " & ".join(f"{token}:*" for token in tokens)
+    query = func.to_tsquery("simple", func.books_unaccent(func.lower(ts_query)))
+    document = literal_column(POSTGRES_DOCUMENT)
+    return (
+        select(
+            models.Book.id.label("book_id"),
+            (-func.ts_rank(document, query)).label("score"),
+        )
+        .where(document.op("@@")(query))
+        .subquery("matches")
+    )
@@ -1,20 +1,29 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func, case
+from sqlalchemy import select
 from fastapi import HTTPException, status
 from typing import List, Optional
-from . import models
+from . import models, search
+from .cache import cached
+from .pagination import BOOK_FIELDS, PageParams, book_query, paginate
 import logging
+import os
 
-def get_all_books(db: Session) -> List[models.Book]:
+# TTL (em segundos) do cache de cada consulta. O cache também é invalidado a cada nova carga de dados.
+CACHE_TTL_BOOK = int(os.getenv("CACHE_TTL_BOOK", "300"))
+CACHE_TTL_CATEGORIES = int(os.getenv("CACHE_TTL_CATEGORIES", "3600"))
+CACHE_TTL_STATS = int(os.getenv("CACHE_TTL_STATS", "3600"))
+
+def get_all_books(db: Session, page: PageParams) -> List[dict]:
     """
-    Busca todos os livros no banco de dados com tratamento de erros.
-    - Lança um erro 404 se nenhum livro for encontrado.
+    Busca uma página de livros no banco de dados com tratamento de erros.
+    - A paginação é feita por cursor (keyset) sobre o `id`.
+    - Lança um erro 404 se nenhum livro for encontrado na primeira página.
     - Lança um erro 500 em caso de falha na consulta ao banco de dados.
     """
     try:
-        books = db.query(models.Book).all()
-        if not books:
+        books = paginate(book_query(db, page.fields), page)
+        if not books and page.cursor is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Nenhum livro foi encontrado na base de dados."
@@ -28,20 +37,31 @@ def get_all_books(db: Session) -> List[models.Book]:
             detail="Ocorreu um erro interno ao acessar a base de dados."
         )
     
-def get_book_by_id(db: Session, book_id: int) -> models.Book:
+def get_books_export_statement(fields: Optional[List[str]] = None):
+    """
+    Monta o SELECT usado no modo de exportação (streaming) de livros.
+    Seleciona apenas as colunas pedidas, ordenadas pelo `id`.
+    """
+    columns = [getattr(models.Book, field) for field in (fields or BOOK_FIELDS)]
+    return select(*columns).order_by(models.Book.id)
+
+@cached(ttl=CACHE_TTL_BOOK)
+def get_book_by_id(db: Session, book_id: int) -> dict:
     """
     Busca um único livro pelo seu ID.
     - Lança um erro 404 se o livro não for encontrado.
     - Lança um erro 500 em caso de falha na consulta ao banco de dados
     """
     try:
-        book = db.query(models.Book).filter(models.Book.id == book_id).first()
+        book = db.execute(
+            select(*[getattr(models.Book, field) for field in BOOK_FIELDS]).where(models.Book.id == book_id)
+        ).mappings().first()
         if not book:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Livro com ID {book_id} não encontrado."
             )
-        return book
+        return dict(book)
     
     except SQLAlchemyError as e:
         logging.error(f"Erro no banco de dados ao buscar livro por ID: {e}")
@@ -50,24 +70,35 @@ def get_book_by_id(db: Session, book_id: int) -> models.Book:
             detail="Ocorreu um erro interno ao acessar a base de dados."
         )
     
-def search_books(db: Session, title: Optional[str] = None, category: Optional[str] = None) -> List[models.Book]:
+def search_books(db: Session, page: PageParams, title: Optional[str] = None, category: Optional[str] = None) -> List[dict]:
     """
     Busca livros por título e/ou categoria.
     - Se nenhum critério for fornecido, retorna todos os livros.
+    - A busca por título usa o índice de busca textual, ordenando os resultados por relevância.
     - Lança um erro 404 se nenhum livro for encontrado com os critérios fornecidos.
     - Lança um erro 500 em caso de falha na consulta ao banco de dados
     """
     try:
-        query = db.query(models.Book)
+        query = book_query(db, page.fields)
+        keys = (models.Book.id,)
 
-        if title:
-            # Usa 'ilike' para uma busca case-insensitive
+        if title and search.is_enabled():
+            matches = search.match_subquery(title)
+            if matches is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Nenhum livro encontrado com os critérios de busca fornecidos."
+                )
+            query = query.join(matches, matches.c.book_id == models.Book.id)
+            keys = (matches.c.score, models.Book.id)
+        elif title:
+            # Sem índice de busca disponível, usa 'ilike' para uma busca case-insensitive
             query = query.filter(models.Book.title.ilike(f"%{title}%"))
         if category:
             # Busca exata para categoria
             query = query.filter(models.Book.category == category)
-        books = query.all()
-        if not books:
+        books = paginate(query, page, keys=keys)
+        if not books and page.cursor is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Nenhum livro encontrado com os critérios de busca fornecidos."
@@ -81,6 +112,7 @@ def search_books(db: Session, title: Optional[str] = None, category: Optional[st
             detail="Ocorreu um erro interno ao acessar a base de dados."
         )
     
+@cached(ttl=CACHE_TTL_CATEGORIES)
 def get_all_categories(db: Session) -> List[str]:
     """
     Retorna uma lista de todas as categorias de livros únicas.
@@ -105,15 +137,16 @@ def get_all_categories(db: Session) -> List[str]:
             detail="Ocorreu um erro interno ao acessar a base de dados."
         )
     
-def get_books_by_price_range(db: Session, min_price: float, max_price: float) -> List[models.Book]:
+def get_books_by_price_range(db: Session, page: PageParams, min_price: float, max_price: float) -> List[dict]:
     """ 
     Filtra livros dentro de uma faixa de preço específica. 
     - Lança um erro 404 se nenhum livro for encontrado na faixa de preço.
     - Lança um erro 500 em caso de falha na consulta ao banco de dados.
     """
     try:
-        books = db.query(models.Book).filter(models.Book.price.between(min_price, max_price)).all()
-        if not books:
+        query = book_query(db, page.fields).filter(models.Book.price.between(min_price, max_price))
+        books = paginate(query, page)
+        if not books and page.cursor is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Nenhum livro encontrado na faixa de preço de {min_price} a {max_price}."
@@ -123,15 +156,16 @@ def get_books_by_price_range(db: Session, min_price: float, max_price: float) ->
         logging.error(f"Erro no banco de dados ao filtrar por preço: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor.")
 
-def get_top_rated_books(db: Session) -> List[models.Book]:
+def get_top_rated_books(db: Session, page: PageParams) -> List[dict]:
     """ 
     Retorna todos os livros com a avaliação máxima ('Five'). 
     - Lança um erro 404 se nenhum livro com avaliação máxima for encontrado.
     - Lança um erro 500 em caso de falha na consulta ao banco de dados.
     """
     try:
-        books = db.query(models.Book).filter(models.Book.rating == 'Five').all()
-        if not books:
+        query = book_query(db, page.fields).filter(models.Book.rating == 'Five')
+        books = paginate(query, page)
+        if not books and page.cursor is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Nenhum livro com avaliação máxima foi encontrado."
@@ -141,24 +175,23 @@ def get_top_rated_books(db: Session) -> List[models.Book]:
         logging.error(f"Erro no banco de dados ao buscar livros mais bem avaliados: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor.")
 
+@cached(ttl=CACHE_TTL_STATS)
 def get_general_stats(db: Session) -> dict:
     """ 
-    Calcula as estatísticas gerais da coleção de livros.
+    Retorna as estatísticas gerais da coleção de livros.
+    - Lê as tabelas de estatísticas pré-calculadas na ingestão.
     - Lança um erro 500 em caso de falha na consulta ao banco de dados.
     """
     try:
-        total_books = db.query(models.Book).count()
-        if total_books == 0:
+        overview = db.get(models.OverviewStats, 1)
+        if overview is None or overview.total_books == 0:
             return {"total_books": 0, "average_price": 0.0, "rating_distribution": {}}
 
-        avg_price_query = db.query(func.avg(models.Book.price)).scalar()
-        average_price = round(avg_price_query, 2) if avg_price_query else 0.0
-
-        rating_dist_query = db.query(models.Book.rating, func.count(models.Book.rating)).group_by(models.Book.rating).all()
-        rating_distribution = {rating: count for rating, count in rating_dist_query}
+        average_price = round(overview.price_sum / overview.total_books, 2)
+        rating_distribution = {row.rating: row.book_count for row in db.query(models.RatingStats).all()}
 
         return {
-            "total_books": total_books,
+            "total_books": overview.total_books,
             "average_price": average_price,
             "rating_distribution": rating_distribution
         }
@@ -166,44 +199,28 @@ def get_general_stats(db: Session) -> dict:
         logging.error(f"Erro no banco de dados ao calcular estatísticas gerais: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor.")
 
+@cached(ttl=CACHE_TTL_STATS)
 def get_category_stats(db: Session) -> List[dict]:
     """ 
-    Calcula estatísticas detalhadas para cada categoria, incluindo rating médio. 
+    Retorna estatísticas detalhadas para cada categoria, incluindo rating médio. 
+    - Lê a tabela de estatísticas por categoria pré-calculada na ingestão.
     - Lança um erro 500 em caso de falha na consulta ao banco de dados.
     """
     try:
-        # Mapeia os ratings de string para número para poder calcular a média
-        rating_map = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
-        rating_case_statement = case(
-            rating_map,
-            value=models.Book.rating,
-            else_=0  # Define 0 para qualquer rating não mapeado
-        )
-
-        stats_query = db.query(
-            models.Book.category,
-            func.count(models.Book.id).label("book_count"),
-            func.avg(models.Book.price).label("average_price"),
-            func.min(models.Book.price).label("min_price"),
-            func.max(models.Book.price).label("max_price"),
-            func.avg(rating_case_statement).label("average_rating") # NOVO CÁLCULO
-        ).group_by(models.Book.category).all()
+        stats_rows = db.query(models.CategoryStats).order_by(models.CategoryStats.category).all()
 
-        if not stats_query:
-            return []
-
-        # Converte o resultado da query para uma lista de dicionários
+        # Converte as linhas pré-calculadas para uma lista de dicionários
         stats_list = [
             {
                 "category": row.category,
                 "book_count": row.book_count,
-                "average_price": round(row.average_price, 2) if row.average_price else 0.0,
+                "average_price": round(row.price_sum / row.book_count, 2) if row.book_count else 0.0,
                 "min_price": row.min_price,
                 "max_price": row.max_price,
-                "average_rating": round(row.average_rating, 2) if row.average_rating else 0.0 # NOVO CAMPO
-            } for row in stats_query
+                "average_rating": round(row.rating_sum / row.book_count, 2) if row.book_count else 0.0
+            } for row in stats_rows
         ]
         return stats_list
     except SQLAlchemyError as e:
         logging.error(f"Erro no banco de dados ao calcular estatísticas por categoria: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor.")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro interno do servidor.")
@@ -0,0 +1,202 @@
+from collections import Counter
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import logging
+import math
+import os
+import re
+import threading
+import time
+from . import models
+from .cache import data_version
+from .pagination import BOOK_FIELDS
+from .ml import ml_models
+
+# NumPy e pandas são importados apenas na construção e na consulta do índice (inicialização mais rápida)
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Configurações do índice de livros similares
+SIMILAR_DEFAULT_K = int(os.getenv("SIMILAR_DEFAULT_K", "5"))
+SIMILAR_MAX_K = int(os.getenv("SIMILAR_MAX_K", "50"))
+# Pesos de cada grupo de features na distância (0 desativa o grupo)
+SIMILAR_CATEGORY_WEIGHT = float(os.getenv("SIMILAR_CATEGORY_WEIGHT", "1.0"))
+SIMILAR_NUMERIC_WEIGHT = float(os.getenv("SIMILAR_NUMERIC_WEIGHT", "0.5"))
+SIMILAR_TITLE_WEIGHT = float(os.getenv("SIMILAR_TITLE_WEIGHT", "0.5"))
+# Vocabulário do TF-IDF dos títulos: termos presentes em ao menos MIN_DF títulos, limitado a MAX_TERMS
+SIMILAR_TITLE_MIN_DF = int(os.getenv("SIMILAR_TITLE_MIN_DF", "2"))
+SIMILAR_TITLE_MAX_TERMS = int(os.getenv("SIMILAR_TITLE_MAX_TERMS", "256"))
+# Pré-cálculo dos vizinhos na construção (até este tamanho de catálogo) e linhas por bloco
+SIMILAR_PRECOMPUTE_MAX_BOOKS = int(os.getenv("SIMILAR_PRECOMPUTE_MAX_BOOKS", "20000"))
+SIMILAR_PRECOMPUTE_BLOCK_SIZE = int(os.getenv("SIMILAR_PRECOMPUTE_BLOCK_SIZE", "1024"))
+
+# Features numéricas do feature store usadas no vetor de cada livro
+NUMERIC_FEATURES = ('price', 'rating_numeric', 'availability_numeric')
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _standardize(values: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+    std = values.std(axis=0)
+    return (values - values.mean(axis=0)) / np.where(std > 0, std, 1.0)
+
+
+def _title_tfidf(titles: List[str]) -> "np.ndarray":
+    """ Matriz TF-IDF (linhas normalizadas) dos títulos sobre um vocabulário limitado. """
+    import numpy as np
+    tokens = [TOKEN_PATTERN.findall(title.lower()) for title in titles]
+    document_frequency = Counter(term for terms in tokens for term in set(terms))
+    vocabulary = [term for term, count in document_frequency.most_common(SIMILAR_TITLE_MAX_TERMS) if count >= SIMILAR_TITLE_MIN_DF]
+    term_index = {term: position for position, term in enumerate(vocabulary)}
+    matrix = np.zeros((len(titles), len(vocabulary)), dtype='float32')
+    for row, terms in enumerate(tokens):
+        for term in terms:
+            column = term_index.get(term)
+            if column is not None:
+                matrix[row, column] += 1.0
+    idf = np.array([math.log((1 + len(titles)) / (1 + document_frequency[term])) + 1 for term in vocabulary], dtype='float32')
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+class SimilarityIndex:
+    """
+    Índice de vizinhos mais próximos sobre os vetores dos livros, mantido em memória.
+    Cada livro é uma linha de uma matriz NumPy com a categoria (one-hot), as features
+    numéricas padronizadas e, opcionalmente, o TF-IDF do título, cada grupo com o seu peso.
+    Os `SIMILAR_MAX_K` vizinhos de cada livro (distância euclidiana) são pré-calculados na
+    construção, em blocos de multiplicação de matrizes; uma consulta é apenas uma leitura.
+    Acima de `SIMILAR_PRECOMPUTE_MAX_BOOKS` livros, os vizinhos são calculados na primeira
+    consulta de cada livro e memorizados.
+    """
+    def __init__(self, books: "pd.DataFrame", vectors: "np.ndarray", version: int):
+        import numpy as np
+        self.books = books[list(BOOK_FIELDS)].to_dict('records')
+        self.book_ids = books['id'].to_numpy()
+        self.positions = {book_id: position for position, book_id in enumerate(self.book_ids.tolist())}
+        self.vectors = vectors
+        self.squared_norms = np.einsum('ij,ij->i', vectors, vectors)
+        self.data_version = version
+        self.neighbour_count = min(SIMILAR_MAX_K, len(self.book_ids) - 1)
+        self._neighbours: Dict[int, Tuple[List[int], List[float]]] = {}
+
+    @classmethod
+    def build(cls, books: "pd.DataFrame", version: int) -> "SimilarityIndex":
+        import numpy as np
+        import pandas as pd
+        if books.empty:
+            return cls(books, np.zeros((0, 0), dtype='float32'), version)
+        blocks = []
+        if SIMILAR_CATEGORY_WEIGHT > 0:
+            blocks.append(pd.get_dummies(books['category']).to_numpy(dtype='float32') * SIMILAR_CATEGORY_WEIGHT)
+        if SIMILAR_NUMERIC_WEIGHT > 0:
+            blocks.append(_standardize(books[list(NUMERIC_FEATURES)].to_numpy(dtype='float32')) * SIMILAR_NUMERIC_WEIGHT)
+        if SIMILAR_TITLE_WEIGHT > 0:
+            blocks.append(_title_tfidf(books['title'].tolist()) * SIMILAR_TITLE_WEIGHT)
+        vectors = np.hstack(blocks) if blocks else np.zeros((len(books), 0), dtype='float32')
+        index = cls(books, np.ascontiguousarray(vectors, dtype='float32'), version)
+        if len(books) <= SIMILAR_PRECOMPUTE_MAX_BOOKS:
+            for start in range(0, len(books), SIMILAR_PRECOMPUTE_BLOCK_SIZE):
+                index._compute_neighbours(np.arange(start, min(start + SIMILAR_PRECOMPUTE_BLOCK_SIZE, len(books))))
+        return index
+
+    def _compute_neighbours(self, positions: "np.ndarray") -> None:
+        """ Calcula e memoriza os vizinhos mais próximos de um bloco de livros. """
+        import numpy as np
+        if self.neighbour_count <= 0:
+            self._neighbours.update((position, ([], [])) for position in positions.tolist())
+            return
+        distances = self.squared_norms[positions, None] - 2 * (self.vectors[positions] @ self.vectors.T) + self.squared_norms
+        distances[np.arange(len(positions)), positions] = np.inf  # O próprio livro não é vizinho
+        nearest = np.argpartition(distances, self.neighbour_count - 1, axis=1)[:, :self.neighbour_count]
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1, kind='stable')
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_distances = np.sqrt(np.maximum(np.take_along_axis(nearest_distances, order, axis=1), 0.0)).astype('float64').round(4)
+        self._neighbours.update(zip(positions.tolist(), zip(nearest.tolist(), nearest_distances.tolist())))
+
+    def similar(self, book_id: int, k: int) -> Optional[List[Dict]]:
+        """ Retorna os `k` livros mais próximos (sem o próprio livro), ou None se o livro não estiver no índice. """
+        position = self.positions.get(book_id)
+        if position is None:
+            return None
+        if position not in self._neighbours:
+            import numpy as np
+            self._compute_neighbours(np.array([position]))
+        neighbours, distances = self._neighbours[position]
+        return [{**self.books[neighbour], 'distance': distance} for neighbour, distance in zip(neighbours[:k], distances[:k])]
+
+
+_index: Optional[SimilarityIndex] = None
+_lock = threading.Lock()
+
+
+def get_books_vector_statement():
+    """ Livros com as suas features do feature store ('ml_data'), base do índice. """
+    feature = ml_models.BookFeature
+    return (
+        select(*[getattr(models.Book, field) for field in BOOK_FIELDS], feature.rating_numeric, feature.availability_numeric)
+        .join(feature, feature.book_id == models.Book.id)
+        .order_by(models.Book.id)
+    )
+
+
+def build_index(db: Session) -> SimilarityIndex:
+    """ (Re)constrói o índice a partir do banco e o mantém em memória. """
+    global _index
+    import pandas as pd
+    started = time.perf_counter()
+    version = data_version()
+    books = pd.read_sql(get_books_vector_statement(), db.connection())
+    _index = SimilarityIndex.build(books, version)
+    logging.info(
+        f"Índice de livros similares construído: {len(books)} livros, {_index.vectors.shape[1]} dimensões, "
+        f"{time.perf_counter() - started:.3f}s."
+    )
+    return _index
+
+
+def load_index() -> None:
+    """ Constrói o índice na inicialização, logo após a ingestão. """
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        build_index(db)
+    finally:
+        db.close()
+
+
+def current_index() -> Optional[SimilarityIndex]:
+    """ Índice em memória, se estiver atualizado em relação à versão atual dos dados (`cache.data_version`). """
+    index = _index
+    if index is not None and index.data_version == data_version():
+        return index
+    return None
+
+
+def get_index(db: Session) -> SimilarityIndex:
+    """
+    Retorna o índice em memória, reconstruindo-o se uma nova carga alterou os dados
+    desde a sua construção. Assim, o índice acompanha a ingestão.
+    """
+    with _lock:
+        return current_index() or build_index(db)
+
+
+def get_similar_books(index: SimilarityIndex, book_id: int, k: int = SIMILAR_DEFAULT_K) -> List[Dict]:
+    """
+    Retorna os `k` livros mais parecidos com o livro informado, do mais próximo ao mais distante.
+    - Lança um erro 404 se o livro não existir (ou ainda não tiver features no feature store).
+    """
+    neighbours = index.similar(book_id, k)
+    if neighbours is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Livro com ID {book_id} não encontrado."
+        )
+    return neighbours
@@ -0,0 +1,193 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import hashlib
+import logging
+import os
+import sys
+import time
+
+# Início da importação da aplicação: este módulo é o primeiro importado por `app.main`
+IMPORT_STARTED = time.perf_counter()
+
+# Configurações da inicialização rápida (cold start em ambientes serverless, como a Vercel)
+# Ativa por padrão quando a variável VERCEL (definida pela plataforma) existe
+FAST_START = os.getenv("FAST_START", "true" if os.getenv("VERCEL") else "false").lower() == "true"
+# Versão do esquema: incremente ao mudar migrações, índices ou gatilhos criados na inicialização
+SCHEMA_VERSION = 1
+
+# Módulos pesados que só devem ser importados quando usados
+LAZY_MODULES = ("numpy", "pandas", "pyarrow")
+
+_timings: Dict = {
+    "import_seconds": None,
+    "schema_seconds": None,
+    "startup_seconds": None,
+    "schema_check": None,
+    "data_check": None,
+}
+_marker: Optional[Dict] = None
+
+
+def schema_fingerprint() -> str:
+    """
+    Identifica o esquema esperado pela aplicação: `SCHEMA_VERSION`, as tabelas e colunas dos modelos
+    e a versão do conjunto de features. Qualquer mudança invalida o marcador gravado no banco.
+    """
+    from . import models
+    from .ml import ml_services  # Registra também as tabelas de ML
+    parts = [f"schema={SCHEMA_VERSION}", f"features={ml_services.FEATURE_SET_VERSION}"]
+    for table in sorted(models.Base.metadata.tables.values(), key=lambda table: table.name):
+        parts.append(f"{table.name}:" + ",".join(f"{column.name} {column.type}" for column in table.columns))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def read_marker(engine) -> Optional[Dict]:
+    """ Marcador gravado pela última inicialização completa, ou None (banco novo ou anterior ao marcador). """
+    from sqlalchemy import select
+    from sqlalchemy.exc import SQLAlchemyError
+    from . import models
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(models.SchemaMarker.fingerprint, models.SchemaMarker.search_backend).where(models.SchemaMarker.id == 1)
+            ).mappings().first()
+    except SQLAlchemyError:
+        return None
+    return dict(row) if row is not None else None
+
+
+def is_schema_current() -> bool:
+    """ Indica se o marcador do banco confere com o esquema atual (lido em `prepare_schema`). """
+    return _marker is not None and _marker["fingerprint"] == schema_fingerprint()
+
+
+def prepare_schema(engine, force: bool = False) -> None:
+    """
+    Cria as tabelas, aplica as migrações e prepara o índice de busca textual.
+    Na inicialização rápida (`FAST_START`), se o marcador do banco confere com o esquema atual,
+    nada disso é executado: o backend da busca textual é restaurado a partir do marcador.
+    Em bancos somente leitura (ex.: `data.db` publicado na Vercel), uma falha na criação ou na
+    migração é registrada e a aplicação segue com o esquema existente.
+    """
+    global _marker
+    from sqlalchemy.exc import SQLAlchemyError
+    from . import ingest, models, search
+    from .ml import feature_store
+
+    started = time.perf_counter()
+    _marker = read_marker(engine)
+    if FAST_START and not force and is_schema_current():
+        search.restore_backend(_marker["search_backend"])
+        _timings["schema_check"] = "skipped"
+    else:
+        try:
+            models.Base.metadata.create_all(bind=engine)
+            ingest.ensure_source_key_column(engine)
+            feature_store.ensure_feature_store_schema(engine)
+            _timings["schema_check"] = "applied"
+        except SQLAlchemyError as e:
+            logging.warning(f"Não foi possível preparar o esquema do banco (somente leitura?). Usando o esquema existente. Erro: {e}")
+            _timings["schema_check"] = "failed"
+        search.setup_search_index(engine)  # Trata as próprias falhas (volta ao ILIKE)
+    _timings["schema_seconds"] = time.perf_counter() - started
+
+
+def needs_data_check() -> bool:
+    """
+    Indica se a inicialização deve verificar os dados (carga do arquivo, estatísticas e feature store).
+    Na inicialização rápida, com o marcador conferindo, o banco já foi preparado por uma inicialização completa.
+    """
+    return not (FAST_START and is_schema_current())
+
+
+def check_data(engine) -> str:
+    """
+    Executa as verificações de dados da inicialização (`check_and_populate_db`) e grava o marcador.
+    Em bancos somente leitura, uma falha é registrada e a aplicação segue com os dados existentes.
+    Retorna o resultado: "applied" ou "failed".
+    """
+    from sqlalchemy.exc import SQLAlchemyError
+    from .database import check_and_populate_db
+    try:
+        check_and_populate_db()
+    except SQLAlchemyError as e:
+        logging.warning(f"Não foi possível verificar os dados do banco (somente leitura?). Usando os dados existentes. Erro: {e}")
+        return "failed"
+    save_marker(engine)
+    return "applied"
+
+
+def save_marker(engine) -> None:
+    """
+    Grava o marcador após uma inicialização completa (se ele mudou). Em sistemas de arquivos somente
+    leitura, como o da Vercel, a gravação falha e apenas um aviso é registrado.
+    """
+    global _marker
+    from sqlalchemy import delete, insert
+    from sqlalchemy.exc import SQLAlchemyError
+    from . import models, search
+
+    marker = {"fingerprint": schema_fingerprint(), "search_backend": search.get_backend()}
+    if _marker == marker:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(delete(models.SchemaMarker))
+            conn.execute(insert(models.SchemaMarker), {
+                "id": 1, **marker, "applied_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            })
+    except SQLAlchemyError as e:
+        logging.warning(f"Não foi possível gravar o marcador de versão do esquema: {e}")
+        return
+    _marker = marker
+    logging.info(f"Marcador de versão do esquema gravado ({marker['fingerprint']}).")
+
+
+def record_import() -> None:
+    """ Registra o tempo de importação da aplicação (chamada ao final de `app.main`). """
+    _timings["import_seconds"] = time.perf_counter() - IMPORT_STARTED
+
+
+def record_startup(started: float, data_check: str) -> None:
+    """ Registra a duração do evento de inicialização e resume o cold start no log. """
+    _timings["startup_seconds"] = time.perf_counter() - started
+    _timings["data_check"] = data_check
+    timings = get_timings()
+    logging.info(
+        f"Inicialização {'rápida' if FAST_START else 'completa'}: importação {timings['import_seconds']:.3f}s, "
+        f"esquema {timings['schema_seconds']:.3f}s ({timings['schema_check']}), "
+        f"startup {timings['startup_seconds']:.3f}s (dados: {data_check}), "
+        f"módulos pesados carregados: {', '.join(timings['lazy_modules_loaded']) or 'nenhum'}."
+    )
+
+
+def get_timings() -> Dict:
+    return {
+        "fast_start": FAST_START,
+        "schema_version": SCHEMA_VERSION,
+        **{key: round(value, 4) if isinstance(value, float) else value for key, value in _timings.items()},
+        "lazy_modules_loaded": [name for name in LAZY_MODULES if name in sys.modules],
+    }
+
+
+def main():
+    """
+    Prepara o banco para a inicialização rápida: `python -m app.startup`.
+    Cria o esquema, carrega os dados e grava o marcador. Rode antes do deploy e publique o banco resultante.
+    """
+    from . import models  # noqa: F401 (importado antes de `database`)
+    from .database import engine, check_and_populate_db
+    prepare_schema(engine, force=True)
+    check_and_populate_db()
+    save_marker(engine)
+    if engine.dialect.name == "sqlite":
+        # Publica um arquivo único: no modo WAL, até a leitura exige criar os arquivos -wal/-shm,
+        # o que falha em sistemas de arquivos somente leitura
+        engine.dispose()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=DELETE")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
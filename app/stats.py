@@ -0,0 +1,175 @@
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from collections import Counter
+from typing import Iterable, Mapping
+import logging
+import os
+from . import models
+
+# Recalcula todas as tabelas de estatísticas na inicialização (checagem de consistência)
+STATS_RECOMPUTE_ON_STARTUP = os.getenv("STATS_RECOMPUTE_ON_STARTUP", "false").lower() == "true"
+
+# Mapeia os ratings de string para número para poder calcular a média
+RATING_MAP = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
+
+
+def _rating_value(rating) -> int:
+    return RATING_MAP.get(rating, 0)  # 0 para qualquer rating não mapeado
+
+
+def recompute_stats(db: Session) -> None:
+    """
+    Recalcula do zero todas as tabelas de estatísticas a partir da tabela 'books'.
+    Não faz commit: a transação fica a cargo de quem chama.
+    """
+    db.query(models.OverviewStats).delete()
+    db.query(models.RatingStats).delete()
+    db.query(models.CategoryStats).delete()
+
+    total_books, price_sum = db.query(func.count(models.Book.id), func.sum(models.Book.price)).one()
+    db.add(models.OverviewStats(id=1, total_books=total_books, price_sum=price_sum or 0.0))
+
+    rating_rows = (
+        db.query(models.Book.rating, func.count(models.Book.rating))
+        .filter(models.Book.rating.isnot(None))
+        .group_by(models.Book.rating)
+        .all()
+    )
+    db.add_all([models.RatingStats(rating=rating, book_count=count) for rating, count in rating_rows])
+
+    rating_case_statement = case(RATING_MAP, value=models.Book.rating, else_=0)
+    category_rows = db.query(
+        models.Book.category,
+        func.count(models.Book.id),
+        func.sum(models.Book.price),
+        func.min(models.Book.price),
+        func.max(models.Book.price),
+        func.sum(rating_case_statement)
+    ).group_by(models.Book.category).all()
+    db.add_all([
+        models.CategoryStats(
+            category=category,
+            book_count=count,
+            price_sum=price_sum or 0.0,
+            min_price=min_price,
+            max_price=max_price,
+            rating_sum=rating_sum or 0
+        ) for category, count, price_sum, min_price, max_price, rating_sum in category_rows
+    ])
+    db.flush()
+    logging.info("Tabelas de estatísticas recalculadas a partir da tabela 'books'.")
+
+
+def _recompute_category(db: Session, category: str) -> None:
+    """ Recalcula a linha de uma única categoria (consulta pelo índice de 'category'). """
+    rating_case_statement = case(RATING_MAP, value=models.Book.rating, else_=0)
+    count, price_sum, min_price, max_price, rating_sum = db.query(
+        func.count(models.Book.id),
+        func.sum(models.Book.price),
+        func.min(models.Book.price),
+        func.max(models.Book.price),
+        func.sum(rating_case_statement)
+    ).filter(models.Book.category == category).one()
+
+    row = db.get(models.CategoryStats, category)
+    if count == 0:
+        if row is not None:
+            db.delete(row)
+        return
+    if row is None:
+        row = models.CategoryStats(category=category)
+        db.add(row)
+    row.book_count = count
+    row.price_sum = price_sum or 0.0
+    row.min_price = min_price
+    row.max_price = max_price
+    row.rating_sum = rating_sum or 0
+
+
+def apply_book_changes(
+    db: Session,
+    added: Iterable[Mapping] = (),
+    removed: Iterable[Mapping] = ()
+) -> None:
+    """
+    Atualiza as estatísticas de forma incremental.
+    - `added` e `removed` contêm os valores ('category', 'price', 'rating') dos livros
+      inseridos e removidos. Uma alteração é representada pela versão antiga em `removed`
+      e pela nova em `added`.
+    - Somas e contagens são ajustadas por delta; apenas categorias cujo mínimo ou máximo
+      pode ter mudado por uma remoção são recalculadas.
+    - Deve ser chamada na mesma transação que alterou a tabela 'books'. Não faz commit.
+    """
+    added, removed = list(added), list(removed)
+    if not added and not removed:
+        return
+    db.flush()
+
+    overview = db.get(models.OverviewStats, 1)
+    if overview is None:
+        # Primeira execução sem tabelas calculadas: o recálculo completo já inclui as alterações
+        recompute_stats(db)
+        return
+
+    overview.total_books += len(added) - len(removed)
+    overview.price_sum += sum(item['price'] or 0.0 for item in added) - sum(item['price'] or 0.0 for item in removed)
+
+    rating_deltas = Counter(item['rating'] for item in added if item['rating'] is not None)
+    rating_deltas.subtract(item['rating'] for item in removed if item['rating'] is not None)
+    for rating, delta in rating_deltas.items():
+        if delta == 0:
+            continue
+        row = db.get(models.RatingStats, rating)
+        if row is None:
+            row = models.RatingStats(rating=rating, book_count=0)
+            db.add(row)
+        row.book_count += delta
+        if row.book_count <= 0:
+            db.delete(row)
+
+    # Agrega as inserções por categoria para tocar cada linha uma única vez
+    added_by_category = {}
+    for item in added:
+        aggregate = added_by_category.setdefault(item['category'], {'count': 0, 'prices': [], 'rating_sum': 0})
+        aggregate['count'] += 1
+        aggregate['rating_sum'] += _rating_value(item['rating'])
+        if item['price'] is not None:
+            aggregate['prices'].append(item['price'])
+    for category, aggregate in added_by_category.items():
+        row = db.get(models.CategoryStats, category)
+        if row is None:
+            row = models.CategoryStats(category=category, book_count=0, price_sum=0.0, rating_sum=0)
+            db.add(row)
+        row.book_count += aggregate['count']
+        row.price_sum += sum(aggregate['prices'])
+        row.rating_sum += aggregate['rating_sum']
+        if aggregate['prices']:
+            prices = aggregate['prices'] + [price for price in (row.min_price, row.max_price) if price is not None]
+            row.min_price, row.max_price = min(prices), max(prices)
+    db.flush()
+
+    stale_categories = set()
+    for item in removed:
+        row = db.get(models.CategoryStats, item['category'])
+        if row is None:
+            continue
+        row.book_count -= 1
+        row.price_sum -= item['price'] or 0.0
+        row.rating_sum -= _rating_value(item['rating'])
+        if row.book_count <= 0 or item['price'] in (row.min_price, row.max_price):
+            stale_categories.add(item['category'])
+
+    db.flush()
+    for category in stale_categories:
+        _recompute_category(db, category)
+    db.flush()
+
+
+def ensure_stats(db: Session) -> None:
+    """
+    Garante que as tabelas de estatísticas existam e estejam preenchidas.
+    Recalcula tudo se ainda não houver dados calculados ou se `STATS_RECOMPUTE_ON_STARTUP` estiver ativo.
+    """
+    if STATS_RECOMPUTE_ON_STARTUP or db.get(models.OverviewStats, 1) is None:
+        recompute_stats(db)
+        db.commit()
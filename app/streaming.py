@@ -0,0 +1,176 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from enum import Enum
+from typing import Callable, Dict, Iterator, Optional, Sequence
+import csv
+import importlib.util
+import io
+import logging
+import os
+import orjson
+from .database import new_read_session
+
+# O pyarrow só é importado na primeira exportação colunar (Parquet / Arrow), fora da inicialização.
+# Sem ele, esses formatos ficam indisponíveis.
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Quantidade de linhas lidas do cursor do banco a cada lote
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+
+class ExportFormat(str, Enum):
+    """ Formatos de resposta suportados pelos endpoints com modo de exportação. """
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+    parquet = "parquet"
+    arrow = "arrow"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+    ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+}
+
+FILE_EXTENSIONS = {
+    ExportFormat.ndjson: "ndjson",
+    ExportFormat.csv: "csv",
+    ExportFormat.parquet: "parquet",
+    ExportFormat.arrow: "arrows",
+}
+
+COLUMNAR_FORMATS = (ExportFormat.parquet, ExportFormat.arrow)
+
+
+def _encode_ndjson(rows: Sequence[dict]) -> bytes:
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+
+def _encode_csv(rows: Sequence[dict], columns: Sequence[str], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Destino em memória para os writers do pyarrow: acumula os bytes escritos e os entrega
+    a cada lote. A posição (`tell`) é cumulativa, como em um arquivo, para os offsets do Parquet.
+    """
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Tipos do Arrow para os tipos Python das colunas exportadas
+ARROW_TYPES = {int: "int64", float: "float64", str: "string", bool: "bool"}
+
+
+def _arrow_schema(columns: Sequence[str], column_types: Dict[str, type]):
+    import pyarrow as pa
+    return pa.schema([(column, ARROW_TYPES.get(column_types[column], "string")) for column in columns])
+
+
+def _statement_column_types(statement) -> Dict[str, type]:
+    """ Tipos Python das colunas do SELECT, usados quando não há `transform`. """
+    return {column.name: column.type.python_type for column in statement.selected_columns}
+
+
+def _iter_columnar(partitions, columns, column_types, export_format) -> Iterator[bytes]:
+    """ Codifica os lotes em Arrow IPC (stream) ou Parquet (um row group por lote). """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _arrow_schema(columns, column_types)
+    sink = _ChunkSink()
+    if export_format == ExportFormat.parquet:
+        writer = pq.ParquetWriter(sink, schema)
+        write = writer.write_table
+        to_batch = pa.Table.from_pylist
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        to_batch = pa.RecordBatch.from_pylist
+    for rows in partitions:
+        write(to_batch(rows, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(
+    statement,
+    columns: Sequence[str],
+    export_format: ExportFormat,
+    transform: Optional[Callable[[dict], dict]] = None,
+    column_types: Optional[Dict[str, type]] = None,
+) -> Iterator[bytes]:
+    """
+    Executa a consulta com um cursor no servidor (`yield_per`) e gera os bytes
+    da resposta lote a lote, sem carregar a tabela inteira em memória.
+    A sessão é aberta dentro do gerador para permanecer viva durante todo o streaming.
+    - Nos formatos colunares, `column_types` define o schema; sem ele, os tipos vêm das colunas do SELECT.
+    """
+    db = new_read_session()
+    try:
+        result = db.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+        partitions = (
+            [transform(row) if transform else dict(row) for row in partition]
+            for partition in result.mappings().partitions()
+        )
+        if export_format in COLUMNAR_FORMATS:
+            yield from _iter_columnar(partitions, columns, column_types or _statement_column_types(statement), export_format)
+            return
+        if export_format == ExportFormat.csv:
+            # Garante que o cabeçalho seja enviado mesmo se não houver linhas
+            yield _encode_csv([], columns, header=True)
+        for rows in partitions:
+            if export_format == ExportFormat.ndjson:
+                yield _encode_ndjson(rows)
+            else:
+                yield _encode_csv(rows, columns, header=False)
+    except Exception as e:
+        # O status 200 já foi enviado; resta registrar o erro e encerrar o stream
+        logging.error(f"Erro durante o streaming da exportação: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def export_response(
+    statement,
+    columns: Sequence[str],
+    export_format: ExportFormat,
+    filename: str,
+    transform: Optional[Callable[[dict], dict]] = None,
+    column_types: Optional[Dict[str, type]] = None,
+) -> StreamingResponse:
+    """ Cria a `StreamingResponse` de exportação em NDJSON, CSV, Parquet ou Arrow IPC. """
+    if export_format in COLUMNAR_FORMATS and not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=400, detail=f"O formato '{export_format.value}' requer o pacote 'pyarrow' instalado no servidor.")
+    return StreamingResponse(
+        iter_export(statement, columns, export_format, transform, column_types),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{FILE_EXTENSIONS[export_format]}"'},
+    )
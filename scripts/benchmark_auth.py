@@ -0,0 +1,77 @@
+"""
+Benchmark da verificação de tokens JWT das rotas protegidas.
+
+Compara o custo de `app.auth.decode_token` a frio (cache vazio: decodificação e verificação
+HMAC com python-jose a cada chamada) e a quente (claims servidas pelo cache, pela hash do token),
+chamando a função diretamente e também através de uma rota protegida.
+
+Uso:
+    python scripts/benchmark_auth.py
+    python scripts/benchmark_auth.py --calls 50000 --requests 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import auth  # noqa: E402
+
+
+def measure_function(token, calls, warm):
+    """Tempo médio (µs) de `decode_token`; a frio, o cache é esvaziado antes de cada chamada."""
+    auth._claims_cache.clear()
+    auth.decode_token(token)
+    started = time.perf_counter()
+    for _ in range(calls):
+        if not warm:
+            auth._claims_cache.clear()
+        auth.decode_token(token)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def measure_route(client, headers, requests, warm):
+    """Tempo médio (µs) de uma requisição a uma rota protegida que não faz mais nada."""
+    auth._claims_cache.clear()
+    client.get('/protected', headers=headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        if not warm:
+            auth._claims_cache.clear()
+        client.get('/protected', headers=headers)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da verificação de JWT (a frio x a quente).")
+    parser.add_argument('--calls', type=int, default=20000, help="Chamadas diretas a decode_token por cenário.")
+    parser.add_argument('--requests', type=int, default=1000, help="Requisições à rota protegida por cenário.")
+    args = parser.parse_args()
+
+    token = auth.create_access_token({"sub": auth.FAKE_USER["username"]})
+    app = FastAPI()
+
+    @app.get('/protected', dependencies=[Depends(auth.verify_token)])
+    def protected():
+        return {}
+
+    client = TestClient(app)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    print(f"{'cenário':<22} {'a frio (µs)':>12} {'a quente (µs)':>14} {'ganho':>8}")
+    for name, func, count, target in (
+        ('decode_token', measure_function, args.calls, token),
+        ('rota protegida', measure_route, args.requests, None),
+    ):
+        call_args = (target, count) if target else (client, headers, count)
+        cold = func(*call_args, warm=False)
+        warm = func(*call_args, warm=True)
+        print(f"{name:<22} {cold:>12.1f} {warm:>14.1f} {cold / warm:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark da engenharia de features do endpoint /ml/features.
+
+Compara a implementação anterior (objetos ORM + DataFrame a partir de `__dict__` + `iterrows`
++ um `BookFeatureSchema` por linha) com a vetorizada de `app/ml/ml_services.py` (a mesma usada
+para materializar o feature store na ingestão), sobre um banco
+SQLite temporário com livros sintéticos. Mede o tempo até o JSON final e confere se as duas
+produzem o mesmo resultado.
+
+Uso:
+    python scripts/benchmark_features.py                      # 10 mil e 1 milhão de livros
+    python scripts/benchmark_features.py --rows 10000 100000 --legacy-max-rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import orjson  # noqa: E402
+import pandas as pd  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import models  # noqa: E402  (importa o app.database na ordem correta)
+from app.ml import ml_schemas, ml_services  # noqa: E402
+
+CATEGORIES = ['Poetry', 'Travel', 'Mystery', 'Historical Fiction', 'Fiction', 'Science', 'Fantasy', 'Romance']
+RATINGS = ['One', 'Two', 'Three', 'Four', 'Five']
+INSERT_BATCH_SIZE = 50000
+
+FEATURE_LIST_ADAPTER = TypeAdapter(list[ml_schemas.BookFeatureSchema])
+
+
+def create_database(path, rows):
+    """Cria um banco SQLite com `rows` livros sintéticos."""
+    engine = create_engine(f'sqlite:///{path}')
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        for start in range(0, rows, INSERT_BATCH_SIZE):
+            conn.execute(insert(models.Book.__table__), [
+                {
+                    'title': f'Livro {number}',
+                    'price': round(rng.uniform(10, 60), 2),
+                    'rating': rng.choice(RATINGS),
+                    'availability': f'In stock ({rng.randint(0, 25)} available)',
+                    'category': rng.choice(CATEGORIES),
+                    'image_url': f'https://example.com/media/{number}.jpg',
+                    'source_key': f'{number:040x}',
+                } for number in range(start, min(start + INSERT_BATCH_SIZE, rows))
+            ])
+    return engine
+
+
+def legacy_features(db):
+    """Implementação anterior de `process_and_return_features`, serializada como na rota."""
+    all_books = db.query(models.Book).all()
+    df = pd.DataFrame([book.__dict__ for book in all_books])
+    df['rating_numeric'] = df['rating'].map(ml_services.RATING_MAP).fillna(0).astype(int)
+    df['availability_numeric'] = df['availability'].str.extract(r'(\d+)', expand=False).fillna(0).astype(int)
+    feature_list = []
+    for _, row in df.iterrows():
+        feature_list.append(ml_schemas.BookFeatureSchema(
+            id=int(row['id']),
+            book_id=int(row['id']),
+            price=float(row['price']),
+            rating_numeric=int(row['rating_numeric']),
+            availability_numeric=int(row['availability_numeric']),
+            category=str(row['category']),
+            feature_version=ml_services.FEATURE_SET_VERSION
+        ))
+    return FEATURE_LIST_ADAPTER.dump_json(feature_list)
+
+
+def vectorized_features(db):
+    """Cálculo vetorizado das features a partir da tabela 'books', serializado a partir das colunas."""
+    books = pd.read_sql(ml_services.get_books_source_statement(), db.connection())
+    return ml_services.features_to_json(ml_services.compute_features(books))
+
+
+def measure(func, session_factory):
+    db = session_factory()
+    try:
+        started = time.perf_counter()
+        body = func(db)
+        return time.perf_counter() - started, body
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da engenharia de features (anterior x vetorizada).")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000], help="Tamanhos da tabela 'books'.")
+    parser.add_argument('--legacy-max-rows', type=int, default=1_000_000,
+                        help="Executa a implementação anterior apenas até este tamanho (ela é lenta).")
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'anterior (s)':>13} {'vetorizada (s)':>15} {'ganho':>8}  resultado")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            engine = create_database(os.path.join(directory, f'books_{rows}.db'), rows)
+            session_factory = sessionmaker(bind=engine)
+            new_time, new_body = measure(vectorized_features, session_factory)
+            if rows <= args.legacy_max_rows:
+                legacy_time, legacy_body = measure(legacy_features, session_factory)
+                same = 'idêntico' if orjson.loads(legacy_body) == orjson.loads(new_body) else 'DIVERGENTE'
+                print(f"{rows:>10} {legacy_time:>13.2f} {new_time:>15.2f} {legacy_time / new_time:>7.1f}x  {same}")
+            else:
+                print(f"{rows:>10} {'-':>13} {new_time:>15.2f} {'-':>8}")
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
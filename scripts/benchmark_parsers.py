@@ -0,0 +1,109 @@
+"""
+Benchmark dos backends de parsing do scraper sobre páginas salvas.
+
+Por padrão, usa as páginas de fixture versionadas em `scripts/fixtures/catalogue` (listagens e
+páginas de detalhes no layout do books.toscrape.com); também aceita arquivos HTML informados na
+linha de comando, como os do cache HTTP da coleta incremental. Para cada backend instalado, mede o
+tempo médio de parsing por página e confere se os registros extraídos (campos do livro e links da
+listagem) são idênticos aos do 'html.parser' (referência).
+
+Uso:
+    python scripts/benchmark_parsers.py
+    python scripts/benchmark_parsers.py --repeat 50
+    python scripts/benchmark_parsers.py data/.http_cache/*.body   # páginas da coleta incremental
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scraper import BASE_URL, PARSERS  # noqa: E402
+
+REFERENCE_PARSER = 'html.parser'
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_pages(paths):
+    """
+    Lê as páginas e as separa em (detalhes, listagens): páginas de detalhes possuem a seção
+    do produto e as de listagem, os cartões dos livros. As demais são ignoradas.
+    """
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, 'catalogue', '**', '*.html'), recursive=True))
+    books, listings = [], []
+    for path in paths:
+        with open(path, 'rb') as page_file:
+            content = page_file.read()
+        if b'product_page' in content:
+            books.append((path, content))
+        elif b'product_pod' in content:
+            listings.append((path, content))
+    return books, listings
+
+
+def _time_backend(parse, pages, repeat):
+    """Executa `parse` `repeat` vezes sobre as páginas. Retorna (segundos por página, resultados)."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        results = [parse(content) for _, content in pages]
+    return (time.perf_counter() - started) / (repeat * len(pages)), results
+
+
+def run(books, listings, repeat, base_url):
+    """
+    Executa cada backend sobre as páginas de detalhes e de listagem.
+    Retorna (tempos por backend, divergências em relação à referência).
+    """
+    _, parse_book, parse_listing = PARSERS[REFERENCE_PARSER]
+    reference = [parse_book(content, base_url) for _, content in books] + [parse_listing(content) for _, content in listings]
+    pages = books + listings
+    timings, mismatches = {}, []
+    for name, (available, parse_book, parse_listing) in PARSERS.items():
+        if not available:
+            print(f"{name:<14} não instalado")
+            continue
+        book_seconds, book_rows = _time_backend(lambda content: parse_book(content, base_url), books, repeat) if books else (0.0, [])
+        listing_seconds, listing_rows = _time_backend(parse_listing, listings, repeat) if listings else (0.0, [])
+        timings[name] = (book_seconds, listing_seconds)
+        for (path, _), row, expected in zip(pages, book_rows + listing_rows, reference):
+            if row != expected:
+                mismatches.append((name, path, row, expected))
+    return timings, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os backends de parsing do scraper.")
+    parser.add_argument('paths', nargs='*', help="Arquivos HTML (padrão: páginas de fixture em scripts/fixtures).")
+    parser.add_argument('--repeat', type=int, default=20, help="Quantidade de passadas por backend.")
+    parser.add_argument('--base-url', default=BASE_URL, help="URL base usada para montar a URL da capa.")
+    args = parser.parse_args()
+
+    books, listings = load_pages(args.paths)
+    if not books and not listings:
+        print("Nenhuma página de detalhes ou de listagem encontrada nos arquivos informados.")
+        return 1
+
+    print(f"{len(books)} páginas de detalhes, {len(listings)} de listagem, {args.repeat} passadas por backend\n")
+    timings, mismatches = run(books, listings, args.repeat, args.base_url)
+    reference_book, reference_listing = timings[REFERENCE_PARSER]
+    print(f"{'backend':<14} {'detalhes':>16} {'':>7}  {'listagem':>16}")
+    for name, (book_seconds, listing_seconds) in sorted(timings.items(), key=lambda item: item[1]):
+        print(
+            f"{name:<14} {book_seconds * 1000:8.3f} ms/página {reference_book / book_seconds if book_seconds else 0:6.1f}x  "
+            f"{listing_seconds * 1000:8.3f} ms/página {reference_listing / listing_seconds if listing_seconds else 0:6.1f}x"
+        )
+
+    if mismatches:
+        print(f"\n{len(mismatches)} divergências em relação ao '{REFERENCE_PARSER}':")
+        for name, path, row, expected in mismatches[:10]:
+            print(f"- {name} em {path}:\n    obtido:   {row}\n    esperado: {expected}")
+        return 1
+    print(f"\nTodos os backends extraíram registros idênticos aos do '{REFERENCE_PARSER}'.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
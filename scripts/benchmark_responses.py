@@ -0,0 +1,70 @@
+"""
+Benchmark de ponta a ponta das respostas JSON de `/api/v1/books` e `/api/v1/ml/features`.
+
+Cria um banco SQLite temporário com livros sintéticos (o mesmo gerador de
+`scripts/benchmark_features.py`), sobe a aplicação com o TestClient, com o cache de consultas e
+o cache HTTP desativados, e mede o tempo médio por requisição (consulta + serialização).
+Rode em duas versões do código (ex.: antes e depois de uma mudança) para compará-las.
+
+Uso:
+    python scripts/benchmark_responses.py
+    python scripts/benchmark_responses.py --rows 100000 --limit 1000 --repeat 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(client, url, headers, repeat):
+    """Tempo médio (ms) e tamanho (bytes) da resposta de `url`."""
+    response = client.get(url, headers=headers)
+    response.raise_for_status()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        client.get(url, headers=headers)
+    return (time.perf_counter() - started) / repeat * 1000, len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das respostas JSON de /books e /ml/features.")
+    parser.add_argument('--rows', type=int, default=10_000, help="Quantidade de livros no banco temporário.")
+    parser.add_argument('--limit', type=int, default=1000, help="Tamanho da página de /books.")
+    parser.add_argument('--repeat', type=int, default=20, help="Requisições por endpoint.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    # Configura a aplicação antes de importá-la: banco temporário e caches desativados
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'books.db')}",
+        'CACHE_ENABLED': 'false',
+        'HTTP_CACHE_TTL': '0',
+        'MODEL_TRAIN_ON_STARTUP': 'never',
+        'RATING_MODEL_PATH': os.path.join(directory, 'rating_model.npz'),
+    })
+    from fastapi.testclient import TestClient
+    from benchmark_features import create_database
+
+    create_database(os.path.join(directory, 'books.db'), args.rows).dispose()
+    from app.main import app
+
+    with TestClient(app) as client:
+        token = client.post('/api/v1/login', data={'username': 'admin', 'password': 'admin123'}).json()['access_token']
+        auth = {'Authorization': f'Bearer {token}'}
+        print(f"{args.rows} livros, {args.repeat} requisições por endpoint\n")
+        print(f"{'endpoint':<48} {'ms/req':>9} {'bytes':>11}")
+        for url, headers in (
+            (f'/api/v1/books?limit={args.limit}', {}),
+            (f'/api/v1/books?limit={args.limit}&fields=title,price', {}),
+            ('/api/v1/ml/features', auth),
+        ):
+            elapsed, size = measure(client, url, headers, args.repeat)
+            print(f"{url:<48} {elapsed:>9.2f} {size:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Site local de fixtures para o scraper: serve as páginas de `scripts/fixtures` em um
+`ThreadingHTTPServer` (uma thread por requisição), sem depender do books.toscrape.com.
+
+Registra, por host, quantas requisições estiveram em andamento ao mesmo tempo e o instante de
+chegada de cada uma, o que permite verificar a concorrência e o limite de taxa do scraper.
+Também conta as respostas por status: o `SimpleHTTPRequestHandler` envia `Last-Modified` e responde
+304 a um `If-Modified-Since` atual, o que permite verificar o cache HTTP da coleta incremental.
+
+Uso:
+    python scripts/fixture_site.py --port 8000
+    python scripts/scraper.py --base-url http://127.0.0.1:8000/ --output /tmp/books.csv
+"""
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import os
+import threading
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serve os arquivos das fixtures, registrando as requisições em andamento no `FixtureSite`."""
+    def __init__(self, *args, site, **kwargs):
+        self.site = site
+        super().__init__(*args, directory=site.directory, **kwargs)
+
+    def do_GET(self):
+        host = self.headers.get('Host', '')
+        self.site.started(host, self.path)
+        try:
+            if self.site.delay:
+                time.sleep(self.site.delay)  # Simula a latência da rede
+            super().do_GET()
+        finally:
+            self.site.finished(host)
+
+    def send_response(self, code, message=None):
+        self.site.responded(code)
+        super().send_response(code, message)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureSite:
+    """
+    Servidor HTTP das fixtures em uma thread, na porta indicada (0 = porta livre escolhida pelo sistema).
+    Usado como gerenciador de contexto: `with FixtureSite() as site: ... site.url ...`.
+    """
+    def __init__(self, directory=FIXTURES_DIR, port=0, delay=0.0):
+        self.directory = directory
+        self.delay = delay
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self.requests = []  # (instante de chegada, host, caminho)
+        self.status_counts = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), partial(FixtureHandler, site=self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}/'
+
+    def started(self, host, path):
+        with self._lock:
+            self.requests.append((time.monotonic(), host, path))
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+
+    def finished(self, host):
+        with self._lock:
+            self.in_flight[host] -= 1
+
+    def responded(self, code):
+        with self._lock:
+            self.status_counts[code] = self.status_counts.get(code, 0) + 1
+
+    def reset(self):
+        """Limpa os registros de requisições, para medir uma nova coleta contra o mesmo servidor."""
+        with self._lock:
+            self.requests.clear()
+            self.status_counts.clear()
+            self.max_in_flight.clear()
+
+    def start(self):
+        """Inicia o servidor em segundo plano."""
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Atende as requisições na thread atual, até uma interrupção."""
+        self._server.serve_forever()
+
+    def stop(self):
+        """Encerra o servidor iniciado com `start` e libera a porta."""
+        self._server.shutdown()
+        self.close()
+
+    def close(self):
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve as páginas de fixture do scraper.")
+    parser.add_argument('--port', type=int, default=8000, help="Porta do servidor (0 = porta livre).")
+    parser.add_argument('--delay', type=float, default=0.0, help="Latência simulada por requisição, em segundos.")
+    args = parser.parse_args()
+    site = FixtureSite(port=args.port, delay=args.delay)
+    print(f"Servindo {site.directory} em {site.url} (Ctrl+C para encerrar)")
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.close()
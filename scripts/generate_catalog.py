@@ -0,0 +1,116 @@
+"""
+Gerador de catálogos sintéticos no formato de `data/books.csv`.
+
+As distribuições seguem o catálogo real coletado pelo scraper (`data/books.csv`, se existir):
+frequência de cada categoria e de cada rating, quantidade em estoque e vocabulário dos títulos.
+Os preços seguem a faixa do site (£10 a £60). Cada livro recebe uma `image_url` única, que é a
+chave estável usada pela ingestão. Sem o CSV real, usa distribuições uniformes.
+
+Uso:
+    python scripts/generate_catalog.py                        # 10 mil, 100 mil e 1 milhão de livros em data/synthetic/
+    python scripts/generate_catalog.py --rows 50000 --output-dir /tmp/catalogos --seed 7
+"""
+import argparse
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+REFERENCE_CSV = os.path.join(DATA_DIR, 'books.csv')
+DEFAULT_OUTPUT_DIR = os.path.join(DATA_DIR, 'synthetic')
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+CHUNK_SIZE = 100_000
+
+COLUMNS = ['title', 'price', 'rating', 'availability', 'category', 'image_url']
+RATINGS = ['One', 'Two', 'Three', 'Four', 'Five']
+MIN_PRICE, MAX_PRICE = 10.0, 60.0
+
+# Usados quando o CSV real não está disponível
+FALLBACK_CATEGORIES = ['Default', 'Nonfiction', 'Sequential Art', 'Add a comment', 'Fiction', 'Young Adult',
+                       'Fantasy', 'Romance', 'Mystery', 'Food and Drink', 'Childrens', 'Historical Fiction',
+                       'Classics', 'Poetry', 'History', 'Womens Fiction', 'Horror', 'Science Fiction', 'Science', 'Music']
+FALLBACK_WORDS = ['the', 'of', 'and', 'a', 'secret', 'life', 'house', 'night', 'love', 'world', 'girl', 'city',
+                  'last', 'new', 'time', 'story', 'book', 'dark', 'war', 'summer', 'garden', 'light', 'road', 'king']
+
+
+class CatalogProfile:
+    """ Distribuições usadas na geração, estimadas a partir de um catálogo real. """
+    def __init__(self, reference_csv=REFERENCE_CSV):
+        if os.path.exists(reference_csv):
+            reference = pd.read_csv(reference_csv)
+            categories = reference['category'].value_counts(normalize=True)
+            ratings = reference['rating'].value_counts(normalize=True).reindex(RATINGS, fill_value=0)
+            self.categories, self.category_weights = categories.index.to_numpy(), categories.to_numpy()
+            self.rating_weights = ratings.to_numpy()
+            self.stock = reference['availability'].str.extract(r'(\d+)', expand=False).dropna().astype(int).to_numpy()
+            words = [word for title in reference['title'] for word in re.findall(r"[A-Za-z']+", title)]
+            self.words = np.array(words)  # Com repetição: palavras comuns saem com mais frequência
+        else:
+            self.categories = np.array(FALLBACK_CATEGORIES)
+            self.category_weights = np.full(len(FALLBACK_CATEGORIES), 1 / len(FALLBACK_CATEGORIES))
+            self.rating_weights = np.full(len(RATINGS), 1 / len(RATINGS))
+            self.stock = np.arange(1, 23)
+            self.words = np.array(FALLBACK_WORDS)
+
+
+def generate_chunk(profile, rng, start, rows):
+    """ Gera `rows` livros, numerados a partir de `start`. """
+    numbers = np.arange(start, start + rows)
+    title_lengths = rng.integers(1, 7, rows)
+    words = profile.words[rng.integers(0, len(profile.words), (rows, 6))]
+    titles = [' '.join(row[:length]).capitalize() for row, length in zip(words.tolist(), title_lengths.tolist())]
+    digests = [hashlib.md5(f'synthetic-{number}'.encode()).hexdigest() for number in numbers.tolist()]
+    return pd.DataFrame({
+        'title': titles,
+        'price': rng.uniform(MIN_PRICE, MAX_PRICE, rows).round(2),
+        'rating': np.array(RATINGS)[rng.choice(len(RATINGS), rows, p=profile.rating_weights)],
+        'availability': [f'In stock ({count} available)' for count in rng.choice(profile.stock, rows).tolist()],
+        'category': profile.categories[rng.choice(len(profile.categories), rows, p=profile.category_weights)],
+        'image_url': [f'https://books.toscrape.com/media/cache/{digest[:2]}/{digest[2:4]}/{digest}.jpg' for digest in digests],
+    }, columns=COLUMNS)
+
+
+def generate(path, rows, seed=42, profile=None):
+    """ Escreve um CSV com `rows` livros sintéticos em `path`. Retorna o caminho. """
+    profile = profile or CatalogProfile()
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        for start in range(0, rows, CHUNK_SIZE):
+            chunk = generate_chunk(profile, rng, start, min(CHUNK_SIZE, rows - start))
+            chunk.to_csv(output, index=False, header=start == 0)
+    return path
+
+
+def catalog_path(output_dir, rows):
+    """ Nome padrão do arquivo: books_10k.csv, books_1m.csv, ... """
+    if rows % 1_000_000 == 0:
+        label = f'{rows // 1_000_000}m'
+    elif rows % 1000 == 0:
+        label = f'{rows // 1000}k'
+    else:
+        label = str(rows)
+    return os.path.join(output_dir, f'books_{label}.csv')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera catálogos sintéticos no formato de data/books.csv.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SIZES, help="Tamanhos dos catálogos.")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help="Diretório de saída (padrão: data/synthetic).")
+    parser.add_argument('--seed', type=int, default=42, help="Semente do gerador (mesma semente, mesmo catálogo).")
+    parser.add_argument('--reference', default=REFERENCE_CSV, help="CSV real usado para estimar as distribuições.")
+    args = parser.parse_args()
+
+    profile = CatalogProfile(args.reference)
+    for rows in args.rows:
+        started = time.perf_counter()
+        path = generate(catalog_path(args.output_dir, rows), rows, args.seed, profile)
+        print(f"{rows:>9} livros -> {path} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Teste de carga de ponta a ponta com catálogos sintéticos de 10 mil, 100 mil e 1 milhão de livros.
+
+Para cada tamanho:
+  1. gera o catálogo com `scripts/generate_catalog.py` (ou reaproveita o arquivo já gerado);
+  2. carrega o arquivo em um banco SQLite temporário com `database.check_and_populate_db`
+     (processo separado, `INGEST_SOURCE_PATH` apontando para o catálogo) e mede o tempo da carga;
+  3. sobe a aplicação com uvicorn em uma porta local e mede o tempo até `/api/v1/health` responder;
+  4. dispara requisições concorrentes (httpx assíncrono) contra todos os endpoints da API
+     (`app/routes.py`, `app/ml/ml_routes.py`, `/metrics` e `/api/v1/debug/profiler`),
+     com ids de livros aleatórios.
+
+Os passos 3 e 4 rodam uma vez por modo de cache (`--cache-modes`):
+  - `cached`: configuração padrão. Após o aquecimento, as rotas com parâmetros fixos são
+    respondidas pelo cache de respostas HTTP, e as latências medem o cache em memória;
+  - `uncached`: `CACHE_ENABLED=false` e `HTTP_CACHE_TTL=0`. Cada requisição passa pela consulta
+    ao banco e pela serialização, o caminho em que uma regressão apareceria.
+
+O resultado (vazão, latência p50/p95/p99, erros e status por endpoint, separados por modo de
+cache) é escrito em JSON, no arquivo de `--output` ou na saída padrão. O progresso vai para a
+saída de erro.
+
+Uso:
+    python scripts/load_test.py
+    python scripts/load_test.py --rows 10000 --requests 500 --concurrency 32 --output resultado.json
+    python scripts/load_test.py --rows 10000 --cache-modes uncached
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_catalog import DEFAULT_OUTPUT_DIR, DEFAULT_SIZES, CatalogProfile, catalog_path, generate  # noqa: E402
+
+API = '/api/v1'
+STARTUP_TIMEOUT = 1800  # A 1 milhão de livros, a inicialização inclui o treino do modelo e o índice de similaridade
+SEARCH_TERMS = ['love', 'night', 'house', 'the secret', 'life', 'world', 'girl', 'war']
+
+# Variáveis de ambiente do servidor em cada modo de cache
+CACHE_MODES = {
+    'cached': {},
+    'uncached': {'CACHE_ENABLED': 'false', 'HTTP_CACHE_TTL': '0'},
+}
+
+# Executado em um processo separado: cria as tabelas (importando a aplicação) e popula o banco
+INGEST_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app.main
+from app.database import check_and_populate_db
+imported = time.perf_counter()
+check_and_populate_db()
+print(json.dumps({"import_seconds": imported - started, "ingest_seconds": time.perf_counter() - imported}))
+"""
+
+
+def endpoints(max_id):
+    """
+    (nome, método, função que monta os argumentos da requisição, autenticada, peso).
+    O peso divide a quantidade de requisições dos endpoints que devolvem o catálogo inteiro.
+    """
+    book_id = lambda: random.randint(1, max_id)  # noqa: E731
+    prediction = lambda: {  # noqa: E731
+        'price': round(random.uniform(10, 60), 2),
+        'category': random.choice(['Fiction', 'Mystery', 'Poetry', 'Default']),
+        'availability_numeric': random.randint(1, 22),
+    }
+    return [
+        ('GET /health', 'GET', lambda: {'url': f'{API}/health'}, False, 1),
+        ('GET /cache/stats', 'GET', lambda: {'url': f'{API}/cache/stats'}, False, 1),
+        ('GET /startup/stats', 'GET', lambda: {'url': f'{API}/startup/stats'}, False, 1),
+        ('GET /metrics', 'GET', lambda: {'url': '/metrics'}, False, 1),
+        ('GET /debug/profiler', 'GET', lambda: {'url': f'{API}/debug/profiler'}, True, 1),
+        ('DELETE /debug/profiler', 'DELETE', lambda: {'url': f'{API}/debug/profiler'}, True, 1),
+        ('GET /books', 'GET', lambda: {'url': f'{API}/books', 'params': {'limit': 50}}, False, 1),
+        ('GET /books/search', 'GET', lambda: {'url': f'{API}/books/search', 'params': {'title': random.choice(SEARCH_TERMS)}}, False, 1),
+        ('GET /books/top-rated', 'GET', lambda: {'url': f'{API}/books/top-rated'}, False, 1),
+        ('GET /books/price-range', 'GET', lambda: {'url': f'{API}/books/price-range', 'params': {'min_price': 20, 'max_price': 25}}, False, 1),
+        ('GET /books/{book_id}', 'GET', lambda: {'url': f'{API}/books/{book_id()}'}, False, 1),
+        ('GET /books/{book_id}/similar', 'GET', lambda: {'url': f'{API}/books/{book_id()}/similar'}, False, 1),
+        ('GET /categories', 'GET', lambda: {'url': f'{API}/categories'}, False, 1),
+        ('GET /stats/overview', 'GET', lambda: {'url': f'{API}/stats/overview'}, False, 1),
+        ('GET /stats/categories', 'GET', lambda: {'url': f'{API}/stats/categories'}, False, 1),
+        ('POST /login', 'POST', lambda: {'url': f'{API}/login', 'data': {'username': 'admin', 'password': 'admin123'}}, False, 1),
+        ('POST /refresh', 'POST', lambda: {'url': f'{API}/refresh'}, True, 1),
+        ('GET /ml/features', 'GET', lambda: {'url': f'{API}/ml/features'}, True, 10),
+        ('GET /ml/training-data', 'GET', lambda: {'url': f'{API}/ml/training-data'}, True, 10),
+        ('POST /ml/predictions', 'POST', lambda: {'url': f'{API}/ml/predictions', 'json': prediction()}, True, 1),
+        ('POST /ml/predictions/batch', 'POST', lambda: {'url': f'{API}/ml/predictions/batch', 'json': {'items': [prediction() for _ in range(32)]}}, True, 1),
+        ('GET /ml/predictions/stats', 'GET', lambda: {'url': f'{API}/ml/predictions/stats'}, True, 1),
+    ]
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    """ Vazão e percentis de latência (ms) de um endpoint. """
+    values = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors + sum(count for status, count in statuses.items() if not status.startswith('2')),
+        'status_codes': statuses,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(float(values.mean()), 3),
+            'p50': round(float(np.percentile(values, 50)), 3),
+            'p95': round(float(np.percentile(values, 95)), 3),
+            'p99': round(float(np.percentile(values, 99)), 3),
+            'max': round(float(values.max()), 3),
+        } if len(values) else None,
+    }
+
+
+async def drive(client, method, build, headers, requests, concurrency):
+    """ Envia `requests` requisições com até `concurrency` em paralelo. """
+    latencies, statuses, errors = [], {}, 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, headers=headers, **build())
+                await response.aread()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, errors, time.perf_counter() - started)
+
+
+async def run_endpoints(base_url, max_id, requests, concurrency, warmup):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        response = await client.post(f'{API}/login', data={'username': 'admin', 'password': 'admin123'})
+        response.raise_for_status()
+        auth = {'Authorization': f"Bearer {response.json()['access_token']}"}
+        results = {}
+        for name, method, build, protected, weight in endpoints(max_id):
+            headers = auth if protected else {}
+            count = max(requests // weight, concurrency)
+            for _ in range(warmup):
+                await client.request(method, headers=headers, **build())
+            results[name] = await drive(client, method, build, headers, count, concurrency)
+            latency = results[name]['latency_ms'] or {}
+            log(f"  {name:<32} {results[name]['throughput_rps'] or 0:>9.1f} req/s  "
+                f"p50 {latency.get('p50', 0):>8.2f} ms  p99 {latency.get('p99', 0):>8.2f} ms  erros {results[name]['errors']}")
+        return results
+
+
+def start_server(env, port, log_path):
+    """
+    Sobe o uvicorn (saída em `log_path`) e espera `/health` responder.
+    Retorna (processo, segundos até ficar pronto).
+    """
+    started = time.perf_counter()
+    with open(log_path, 'w') as server_log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+            cwd=ROOT_DIR, env=env, stdout=server_log, stderr=subprocess.STDOUT,
+        )
+    while time.perf_counter() - started < STARTUP_TIMEOUT:
+        if process.poll() is not None:
+            raise RuntimeError(f"O servidor terminou durante a inicialização (código {process.returncode}). Veja {log_path}.")
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}{API}/health', timeout=1).status_code == 200:
+                return process, time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Tempo esgotado esperando a inicialização do servidor.")
+
+
+def run_size(rows, args, profile):
+    path = catalog_path(args.catalog_dir, rows)
+    if not os.path.exists(path):
+        log(f"Gerando {rows} livros em {path}...")
+        generate(path, rows, args.seed, profile)
+
+    directory = tempfile.mkdtemp(prefix=f'load_test_{rows}_')
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(directory, 'books.db')}",
+        INGEST_SOURCE_PATH=os.path.abspath(path),
+        RATING_MODEL_PATH=os.path.join(directory, 'rating_model.npz'),
+        MODEL_EPOCHS=str(args.model_epochs),
+        PYTHONPATH=ROOT_DIR,
+    )
+    log(f"Carregando {rows} livros com check_and_populate_db...")
+    ingest = subprocess.run([sys.executable, '-c', INGEST_SCRIPT], cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    if ingest.returncode != 0:
+        raise RuntimeError(f"Falha na carga de {path}:\n{ingest.stderr}")
+    ingest_timing = json.loads(ingest.stdout.strip().splitlines()[-1])
+
+    passes = {}
+    for mode in args.cache_modes:
+        port = free_port()
+        log(f"Subindo o uvicorn na porta {port} (cache: {mode})...")
+        server_env = dict(env, **CACHE_MODES[mode])
+        process, startup_seconds = start_server(server_env, port, os.path.join(directory, f'server_{mode}.log'))
+        try:
+            results = asyncio.run(run_endpoints(f'http://127.0.0.1:{port}', rows, args.requests, args.concurrency, args.warmup))
+        finally:
+            process.terminate()
+            process.wait()
+        passes[mode] = {
+            'env': CACHE_MODES[mode],
+            'startup_seconds': round(startup_seconds, 3),
+            'endpoints': results,
+        }
+    return {
+        'rows': rows,
+        'catalog': os.path.abspath(path),
+        'ingest_seconds': round(ingest_timing['ingest_seconds'], 3),
+        'passes': passes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com catálogos sintéticos (saída em JSON).")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SIZES, help="Tamanhos dos catálogos.")
+    parser.add_argument('--requests', type=int, default=1000, help="Requisições por endpoint (os que devolvem o catálogo inteiro recebem 1/10).")
+    parser.add_argument('--concurrency', type=int, default=32, help="Requisições simultâneas.")
+    parser.add_argument('--warmup', type=int, default=3, help="Requisições de aquecimento por endpoint (não medidas).")
+    parser.add_argument('--catalog-dir', default=DEFAULT_OUTPUT_DIR, help="Onde ficam (ou serão gerados) os catálogos.")
+    parser.add_argument('--seed', type=int, default=42, help="Semente dos catálogos e das requisições.")
+    parser.add_argument('--model-epochs', type=int, default=100, help="Épocas do treino do modelo na inicialização.")
+    parser.add_argument('--cache-modes', nargs='+', choices=list(CACHE_MODES), default=list(CACHE_MODES),
+                        help="Passadas do teste: com os caches da aplicação (cached) e sem eles (uncached).")
+    parser.add_argument('--output', help="Arquivo JSON de saída (padrão: saída padrão).")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    profile = CatalogProfile()
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {'requests': args.requests, 'concurrency': args.concurrency, 'warmup': args.warmup,
+                   'seed': args.seed, 'model_epochs': args.model_epochs, 'cache_modes': args.cache_modes},
+        'results': [run_size(rows, args, profile) for rows in args.rows],
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+        log(f"Resultado salvo em {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
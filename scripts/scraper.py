@@ -1,8 +1,37 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+import argparse
 import csv
+import hashlib
+import json
 import os
 import logging
+import threading
+import time
+
+# Backends de parsing opcionais (mais rápidos que o 'html.parser' do BeautifulSoup)
+try:
+    from lxml import etree as lxml_etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+# Saída em Parquet (opcional)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 # Configuração do Logging
 logging.basicConfig(
@@ -14,112 +43,603 @@ logging.basicConfig(
 )
 
 # Variaveis de configuração
-BASE_URL = 'https://books.toscrape.com/'
-START_URL = f'{BASE_URL}catalogue/page-1.html'
+BASE_URL = os.getenv('SCRAPER_BASE_URL', 'https://books.toscrape.com/')
 OUTPUT_CSV_PATH = os.path.join('data', 'books.csv')
 
-def get_soup(url):
-    """Faz uma requisição GET para a URL e retorna um objeto BeautifulSoup."""
+# Configurações de concorrência e resiliência das requisições
+CONCURRENCY = int(os.getenv('SCRAPER_CONCURRENCY', '8'))
+RATE_LIMIT = float(os.getenv('SCRAPER_RATE_LIMIT', '20'))  # Requisições por segundo por host (0 = sem limite)
+MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', '3'))
+BACKOFF_FACTOR = float(os.getenv('SCRAPER_BACKOFF_FACTOR', '0.5'))
+REQUEST_TIMEOUT = float(os.getenv('SCRAPER_TIMEOUT', '15'))
+
+# Configurações do pipeline: processos de parsing (0 = parsing nas próprias threads de download)
+# e quantidade de linhas gravadas por lote
+PARSE_WORKERS = int(os.getenv('SCRAPER_PARSE_WORKERS', str(os.cpu_count() or 1)))
+WRITE_BATCH_SIZE = int(os.getenv('SCRAPER_WRITE_BATCH_SIZE', '100'))
+
+# Backend de parsing do HTML ('auto' escolhe o mais rápido instalado)
+PARSER_BACKEND = os.getenv('SCRAPER_PARSER', 'auto')
+
+# Arquivos da coleta incremental
+HTTP_CACHE_DIR = os.getenv('SCRAPER_HTTP_CACHE_DIR', os.path.join('data', '.http_cache'))
+CHECKPOINT_PATH = os.path.join('data', '.scraper_checkpoint.jsonl')
+STATE_PATH = os.path.join('data', 'scraper_state.json')
+DELTA_CSV_PATH = os.path.join('data', 'books_delta.csv')
+
+CSV_HEADERS = ['title', 'price', 'rating', 'availability', 'category', 'image_url']
+
+
+class HostRateLimiter:
+    """
+    Limita a taxa de requisições por host, espaçando-as igualmente.
+    Seguro para uso entre as threads do pool.
+    """
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_rate_limiter = HostRateLimiter(RATE_LIMIT)
+
+
+def _write_atomic(path, data):
+    """Grava o arquivo por completo em um temporário e o renomeia, evitando arquivos pela metade."""
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(data)
+    os.replace(tmp_path, path)
+
+
+class HttpCache:
+    """
+    Cache HTTP em disco, uma entrada por URL.
+    Guarda o corpo e os validadores (ETag / Last-Modified) da resposta e os reenvia como
+    If-None-Match / If-Modified-Since; uma resposta 304 reaproveita o corpo salvo.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.revalidated = 0
+        self.downloaded = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def load(self, url):
+        """Retorna (validadores, corpo) da entrada da URL, ou None se não houver."""
+        path = self._path(url)
+        try:
+            with open(path + '.json', encoding='utf-8') as meta_file:
+                validators = json.load(meta_file)
+            with open(path + '.body', 'rb') as body_file:
+                return validators, body_file.read()
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url, response):
+        """Salva a resposta se ela tiver validadores; sem eles não haveria como revalidar."""
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['If-None-Match'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        if not validators:
+            return
+        path = self._path(url)
+        # O corpo é gravado antes dos validadores: uma entrada só vale quando o .json existe
+        _write_atomic(path + '.body', response.content)
+        _write_atomic(path + '.json', json.dumps(validators).encode('utf-8'))
+
+    def count(self, revalidated):
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.downloaded += 1
+
+
+class Checkpoint:
+    """
+    Registro em disco (JSON Lines) dos livros já gravados na execução atual.
+    Se a coleta for interrompida, a próxima execução reaproveita essas linhas em vez
+    de baixar as páginas de novo. O arquivo é removido ao final de uma coleta completa.
+    """
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.rows = {}
+        if resume and os.path.exists(path):
+            with open(path, encoding='utf-8') as checkpoint_file:
+                for line in checkpoint_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Última linha incompleta (processo interrompido no meio da escrita)
+                    self.rows[entry['url']] = entry['row']
+        # Reescreve apenas as entradas válidas antes de voltar a acrescentar linhas
+        self._file = open(path, 'w', encoding='utf-8')
+        for url, row in self.rows.items():
+            self._file.write(json.dumps({'url': url, 'row': row}) + '\n')
+        self._file.flush()
+
+    def record(self, entries):
+        """Registra um lote de pares (url, linha) com uma única escrita."""
+        self._file.write(''.join(json.dumps({'url': url, 'row': row}) + '\n' for url, row in entries))
+        self._file.flush()
+
+    def close(self, completed):
+        self._file.close()
+        if completed:
+            os.remove(self.path)
+
+
+def content_hash(row):
+    """Hash do conteúdo extraído de um livro, usado para detectar alterações entre coletas."""
+    return hashlib.sha1(json.dumps(row, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_state(path):
+    """Carrega o hash de conteúdo de cada URL de livro da última coleta completa."""
+    try:
+        with open(path, encoding='utf-8') as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def create_session(pool_size=CONCURRENCY, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """
+    Cria uma sessão HTTP com conexões keep-alive reaproveitadas (um pool por host)
+    e novas tentativas com backoff exponencial para falhas de conexão e status 429/5xx.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch(url, session=None, http_cache=None):
+    """
+    Faz uma requisição GET e retorna o corpo da resposta.
+    Com `http_cache`, envia os validadores salvos e reaproveita o corpo em cache quando o servidor responde 304.
+    """
+    cached = http_cache.load(url) if http_cache else None
+    _rate_limiter.wait(url)
+    response = (session or requests).get(url, timeout=REQUEST_TIMEOUT, headers=cached[0] if cached else None)
+    if cached and response.status_code == 304:
+        http_cache.count(revalidated=True)
+        return cached[1]
+    response.raise_for_status()
+    if http_cache:
+        http_cache.store(url, response)
+        http_cache.count(revalidated=False)
+    return response.content
+
+
+def fetch_page(url, session=None, http_cache=None):
+    """Baixa a página da URL, registrando no log e retornando None em caso de erro."""
     try:
-        response = requests.get(url)
-        response.raise_for_status()  
-        return BeautifulSoup(response.content, 'html.parser')
+        return fetch(url, session, http_cache)
     except requests.exceptions.RequestException as e:
         logging.error(f"Erro ao acessar a URL {url}: {e}")
         return None
 
-def scrape_book_details(book_url):
-    """Raspa os detalhes de um único livro a partir de sua página de detalhes."""
-    soup = get_soup(book_url)
-    if not soup:
+
+def _decode(content):
+    """Decodifica o HTML (o site é servido em UTF-8) para os parsers que recebem texto."""
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('latin-1')
+
+
+def _book_from_soup(soup, base_url):
+    title = soup.find('h1').text
+
+    raw_price = soup.find('p', class_='price_color').text
+    price = raw_price.replace('£', '')
+
+    rating_tag = soup.find('p', class_='star-rating')
+    rating = rating_tag['class'][1] if rating_tag else 'N/A' # Ex: 'Three'
+
+    availability_tag = soup.find('p', class_='instock availability')
+    availability = availability_tag.text.strip() if availability_tag else 'N/A'
+
+    image_tag = soup.find('div', class_='item active').find('img')
+    image_url = base_url + image_tag['src'].replace('../', '') if image_tag else 'N/A'
+
+    category_tag = soup.find('ul', class_='breadcrumb').find_all('li')[2].find('a')
+    category = category_tag.text if category_tag else 'N/A'
+
+    return {
+        'title': title,
+        'price': price,
+        'rating': rating,
+        'availability': availability,
+        'category': category,
+        'image_url': image_url
+    }
+
+
+def _listing_from_soup(soup):
+    book_hrefs = [a['href'] for a in soup.select('h3 > a')]
+    next_page_tag = soup.find('li', class_='next')
+    next_href = next_page_tag.find('a')['href'] if next_page_tag and next_page_tag.find('a') else None
+    return book_hrefs, next_href
+
+
+def parse_book_html_parser(content, base_url):
+    """BeautifulSoup com o 'html.parser' e a árvore completa (implementação original)."""
+    return _book_from_soup(BeautifulSoup(content, 'html.parser'), base_url)
+
+
+def parse_listing_bs4(content):
+    return _listing_from_soup(BeautifulSoup(content, 'html.parser'))
+
+
+def _xpath_class(tag, css_class):
+    """XPath equivalente ao seletor CSS `tag.css_class`."""
+    return f'//{tag}[contains(concat(" ", normalize-space(@class), " "), " {css_class} ")]'
+
+
+def parse_book_lxml(content, base_url):
+    """lxml com consultas XPath."""
+    tree = lxml_html.fromstring(_decode(content))
+    title = tree.xpath('//h1')[0].text_content()
+    price = tree.xpath(_xpath_class('p', 'price_color'))[0].text_content().replace('£', '')
+
+    rating_tags = tree.xpath(_xpath_class('p', 'star-rating'))
+    rating = rating_tags[0].get('class').split()[1] if rating_tags else 'N/A'
+
+    availability_tags = tree.xpath('//p[@class="instock availability"]')
+    availability = availability_tags[0].text_content().strip() if availability_tags else 'N/A'
+
+    image_tags = tree.xpath('//div[@class="item active"]')[0].xpath('.//img')
+    image_url = base_url + image_tags[0].get('src').replace('../', '') if image_tags else 'N/A'
+
+    category_tags = tree.xpath(_xpath_class('ul', 'breadcrumb'))[0].xpath('.//li')[2].xpath('.//a')
+    category = category_tags[0].text_content() if category_tags else 'N/A'
+
+    return {
+        'title': title,
+        'price': price,
+        'rating': rating,
+        'availability': availability,
+        'category': category,
+        'image_url': image_url
+    }
+
+
+def parse_listing_lxml(content):
+    tree = lxml_html.fromstring(_decode(content))
+    book_hrefs = tree.xpath('//h3/a/@href')
+    next_hrefs = tree.xpath(_xpath_class('li', 'next') + '//a/@href')
+    return book_hrefs, next_hrefs[0] if next_hrefs else None
+
+
+def parse_book_selectolax(content, base_url):
+    """selectolax (parser Lexbor, em C) com seletores CSS."""
+    tree = SelectolaxParser(_decode(content))
+    title = tree.css_first('h1').text()
+    price = tree.css_first('p.price_color').text().replace('£', '')
+
+    rating_tag = tree.css_first('p.star-rating')
+    rating = rating_tag.attributes['class'].split()[1] if rating_tag else 'N/A'
+
+    availability_tag = tree.css_first('p[class="instock availability"]')
+    availability = availability_tag.text().strip() if availability_tag else 'N/A'
+
+    image_tag = tree.css_first('div[class="item active"]').css_first('img')
+    image_url = base_url + image_tag.attributes['src'].replace('../', '') if image_tag else 'N/A'
+
+    category_tag = tree.css_first('ul.breadcrumb').css('li')[2].css_first('a')
+    category = category_tag.text() if category_tag else 'N/A'
+
+    return {
+        'title': title,
+        'price': price,
+        'rating': rating,
+        'availability': availability,
+        'category': category,
+        'image_url': image_url
+    }
+
+
+def parse_listing_selectolax(content):
+    tree = SelectolaxParser(_decode(content))
+    book_hrefs = [a.attributes['href'] for a in tree.css('h3 > a')]
+    next_tag = tree.css_first('li.next a')
+    return book_hrefs, next_tag.attributes['href'] if next_tag else None
+
+
+# Backends de parsing: nome -> (instalado, parser da página de detalhes, parser da listagem)
+PARSERS = {
+    'html.parser': (True, parse_book_html_parser, parse_listing_bs4),
+    'lxml': (lxml_html is not None, parse_book_lxml, parse_listing_lxml),
+    'selectolax': (SelectolaxParser is not None, parse_book_selectolax, parse_listing_selectolax),
+}
+AUTO_PARSER_ORDER = ['selectolax', 'lxml', 'html.parser']
+
+
+# Erros de parsing tratados como página inválida (layout alterado, corpo vazio ou truncado).
+# O lxml recusa um documento vazio com `ParserError` em vez de gerar uma árvore vazia.
+PARSE_ERRORS = (AttributeError, IndexError, KeyError, TypeError) + ((lxml_etree.LxmlError,) if lxml_html is not None else ())
+
+
+def resolve_parser(name=PARSER_BACKEND):
+    """Valida o backend de parsing; 'auto' (ou um backend não instalado) usa o mais rápido disponível."""
+    if name not in PARSERS and name != 'auto':
+        raise ValueError(f"Backend de parsing desconhecido: '{name}'. Opções: auto, {', '.join(PARSERS)}.")
+    if name != 'auto' and not PARSERS[name][0]:
+        logging.warning(f"O backend de parsing '{name}' não está instalado. Usando outro disponível.")
+        name = 'auto'
+    if name == 'auto':
+        name = next(candidate for candidate in AUTO_PARSER_ORDER if PARSERS[candidate][0])
+    return name
+
+
+def parse_book_details(book_url, content, base_url=BASE_URL, parser='html.parser'):
+    """
+    Extrai os detalhes de um livro do HTML já baixado da sua página.
+    Função de nível de módulo para poder rodar nos processos do pool de parsing.
+    """
+    if content is None:
         logging.warning(f"Não foi possível obter detalhes do livro em: {book_url}")
         return None
 
     try:
-        title = soup.find('h1').text
-        
-        raw_price = soup.find('p', class_='price_color').text
-        price = raw_price.replace('£', '')
-        
-        rating_tag = soup.find('p', class_='star-rating')
-        rating = rating_tag['class'][1] if rating_tag else 'N/A' # Ex: 'Three'
-        
-        availability_tag = soup.find('p', class_='instock availability')
-        availability = availability_tag.text.strip() if availability_tag else 'N/A'
-        
-        image_tag = soup.find('div', class_='item active').find('img')
-        image_url = BASE_URL + image_tag['src'].replace('../', '') if image_tag else 'N/A'
-        
-        category_tag = soup.find('ul', class_='breadcrumb').find_all('li')[2].find('a')
-        category = category_tag.text if category_tag else 'N/A'
-        
-        return {
-            'title': title,
-            'price': price,
-            'rating': rating,
-            'availability': availability,
-            'category': category,
-            'image_url': image_url
-        }
-    except AttributeError as e:
+        return PARSERS[parser][1](content, base_url)
+    except PARSE_ERRORS as e:
         logging.error(f"Erro ao extrair um atributo em {book_url}. O layout da página pode ter mudado. Erro: {e}")
         return None
 
 
-def main():
-    """Função principal para orquestrar o processo de web scraping."""
-    logging.info("Iniciando o processo de web scraping...")
-    
-    os.makedirs(os.path.dirname(OUTPUT_CSV_PATH), exist_ok=True)
-    
-    headers = ['title', 'price', 'rating', 'availability', 'category', 'image_url']
+def scrape_book_details(book_url, session=None, base_url=BASE_URL, http_cache=None, parser='html.parser'):
+    """Raspa os detalhes de um único livro a partir de sua página de detalhes."""
+    return parse_book_details(book_url, fetch_page(book_url, session, http_cache), base_url, parser)
+
+
+def _chain(source, target):
+    """Repassa o resultado (ou a exceção) de um Future concluído para outro."""
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def submit_book(book_url, fetch_executor, parse_executor, session=None, base_url=BASE_URL, http_cache=None,
+                parser='html.parser'):
+    """
+    Envia um livro ao pipeline: o download roda no pool de threads e, ao terminar, o HTML
+    é repassado ao pool de processos para o parsing. Retorna um Future com a linha extraída.
+    Sem `parse_executor`, o parsing roda na própria thread de download.
+    """
+    if parse_executor is None:
+        return fetch_executor.submit(scrape_book_details, book_url, session, base_url, http_cache, parser)
+
+    result = Future()
+
+    def on_fetched(fetch_future):
+        if fetch_future.exception() is not None:
+            result.set_exception(fetch_future.exception())
+            return
+        try:
+            parse_future = parse_executor.submit(parse_book_details, book_url, fetch_future.result(), base_url, parser)
+        except RuntimeError as e:  # Pool já encerrado (ex.: interrupção)
+            result.set_exception(e)
+            return
+        parse_future.add_done_callback(lambda done: _chain(done, result))
+
+    fetch_executor.submit(fetch_page, book_url, session, http_cache).add_done_callback(on_fetched)
+    return result
+
+
+def iter_book_links(session, base_url=BASE_URL, http_cache=None, parser='html.parser'):
+    """
+    Navega pelas páginas de listagem (paginação) e gera, página a página,
+    a lista de URLs dos livros encontrados.
+    """
+    current_url = f'{base_url}catalogue/page-1.html'
+    page_num = 1
+
+    while current_url:
+        logging.info(f"Raspando página {page_num}: {current_url}")
+        content = fetch_page(current_url, session, http_cache)
+
+        if content is None:
+            logging.warning(f"Não foi possível processar a página {page_num}. Interrompendo.")
+            break
+
+        try:
+            book_hrefs, next_page_href = PARSERS[parser][2](content)
+        except PARSE_ERRORS as e:
+            logging.error(f"Erro ao processar a página {page_num} ({current_url}). Interrompendo. Erro: {e}")
+            break
+        book_links = [base_url + 'catalogue/' + href.replace('../', '') for href in book_hrefs]
+        logging.info(f"Encontrados {len(book_links)} livros na página {page_num}.")
+        yield book_links
+
+        if next_page_href:
+            current_url = base_url + 'catalogue/' + next_page_href
+            page_num += 1
+        else:
+            logging.info("Nenhuma outra página encontrada. Finalizando a navegação.")
+            current_url = None
+
+
+def write_parquet(csv_path, parquet_path):
+    """Converte o CSV gerado para Parquet (formato colunar), com o preço como número."""
+    column_types = {column: pa.string() for column in CSV_HEADERS}
+    column_types['price'] = pa.float64()
+    table = pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=False)
+    )
+    pq.write_table(table, parquet_path)
+    return table.num_rows
+
+
+def main(concurrency=CONCURRENCY, base_url=BASE_URL, output_path=OUTPUT_CSV_PATH, incremental=False,
+         delta_path=DELTA_CSV_PATH, resume=True, parser=PARSER_BACKEND, parse_workers=PARSE_WORKERS,
+         parquet=False):
+    """
+    Função principal para orquestrar o processo de web scraping, em um pipeline de três estágios:
+    - download: as páginas de detalhes são baixadas por um pool de `concurrency` threads,
+      enquanto a listagem segue navegando;
+    - parsing: o HTML baixado é processado por um pool de `parse_workers` processos, usando
+      todos os núcleos (com 0, o parsing roda nas threads de download);
+    - escrita: um único estágio grava as linhas em lotes, na ordem da listagem.
+    A quantidade de livros em andamento no pipeline é limitada, mantendo a memória constante.
+    - Cada livro gravado é registrado em um checkpoint; uma execução interrompida é retomada
+      a partir dele (exceto com `resume=False`).
+    - `parser` escolhe o backend de parsing do HTML (ver `PARSERS`).
+    - No modo `incremental`, as páginas passam pelo cache HTTP em disco e os livros novos ou
+      alterados desde a última coleta completa (comparados pelo hash do conteúdo) também são
+      gravados em `delta_path`, que pode ser aplicado com `python -m app.ingest <delta.csv>`.
+    - Com `parquet`, o resultado também é salvo em Parquet, ao lado do CSV (ex.: data/books.parquet).
+    """
+    if parquet and pa is None:
+        raise RuntimeError("A saída em Parquet requer o pacote 'pyarrow'.")
+    parser = resolve_parser(parser)
+    logging.info(
+        f"Iniciando o processo de web scraping (concorrência: {concurrency}, processos de parsing: {parse_workers}, "
+        f"incremental: {incremental}, parser: {parser})..."
+    )
+    started = time.perf_counter()
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH) or '.', exist_ok=True)
+
     books_scraped_count = 0
-    
-    with open(OUTPUT_CSV_PATH, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=headers)
-        writer.writeheader()
-        
-        current_url = START_URL
-        page_num = 1
-        
-        # Loop para navegar por todas as páginas (paginação)
-        while current_url:
-            logging.info(f"Raspando página {page_num}: {current_url}")
-            main_page_soup = get_soup(current_url)
-            
-            if not main_page_soup:
-                logging.warning(f"Não foi possível processar a página {page_num}. Interrompendo.")
-                break
-
-            book_links = [
-                BASE_URL + 'catalogue/' + a['href'].replace('../', '') 
-                for a in main_page_soup.select('h3 > a')
-            ]
-            
-            logging.info(f"Encontrados {len(book_links)} livros na página {page_num}.")
-            
-            for link in book_links:
-                book_details = scrape_book_details(link)
+    changed_count = 0
+    # Uma conexão por thread de download, mais a da navegação pela listagem (thread principal)
+    session = create_session(pool_size=concurrency + 1)
+    http_cache = HttpCache(HTTP_CACHE_DIR) if incremental else None
+    checkpoint = Checkpoint(CHECKPOINT_PATH, resume=resume)
+    if checkpoint.rows:
+        logging.info(f"Retomando a coleta interrompida: {len(checkpoint.rows)} livros já registrados no checkpoint.")
+    previous_state = load_state(STATE_PATH)
+    state = {}
+    completed = False
+
+    delta_file = open(delta_path, 'w', newline='', encoding='utf-8') if incremental else None
+    parse_executor = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    try:
+        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS)
+            writer.writeheader()
+            delta_writer = csv.DictWriter(delta_file, fieldnames=CSV_HEADERS) if delta_file else None
+            if delta_writer:
+                delta_writer.writeheader()
+
+            # Fila limitada de livros em andamento (download + parsing): quando cheia, a listagem
+            # espera o estágio de escrita consumir o primeiro item, o que mantém a memória constante
+            pending = deque()
+            max_pending = (concurrency + max(parse_workers, 1)) * 4
+            batch = []
+
+            def flush_batch():
+                nonlocal changed_count
+                rows = [row for _, row in batch]
+                writer.writerows(rows)
+                new_entries = [(link, row) for link, row in batch if link not in checkpoint.rows]
+                if new_entries:
+                    checkpoint.record(new_entries)
+                for link, row in batch:
+                    state[link] = content_hash(row)
+                    if previous_state.get(link) != state[link]:
+                        changed_count += 1
+                        if delta_writer:
+                            delta_writer.writerow(row)
+                batch.clear()
+
+            def write_next():
+                nonlocal books_scraped_count
+                link, future = pending.popleft()
+                book_details = checkpoint.rows[link] if future is None else future.result()
                 if book_details:
-                    writer.writerow(book_details)
+                    batch.append((link, book_details))
                     books_scraped_count += 1
-            
-            next_page_tag = main_page_soup.find('li', class_='next')
-            if next_page_tag and next_page_tag.find('a'):
-                next_page_href = next_page_tag.find('a')['href']
-                current_url = BASE_URL + 'catalogue/' + next_page_href
-                page_num += 1
-            else:
-                logging.info("Nenhuma outra página encontrada. Finalizando a navegação.")
-                current_url = None
-    
+                    if len(batch) >= WRITE_BATCH_SIZE:
+                        flush_batch()
+
+            for book_links in iter_book_links(session, base_url, http_cache, parser):
+                for link in book_links:
+                    if link in checkpoint.rows:
+                        pending.append((link, None))
+                    else:
+                        pending.append((link, submit_book(link, executor, parse_executor, session, base_url, http_cache, parser)))
+                    if len(pending) >= max_pending:
+                        write_next()
+            while pending:
+                write_next()
+            flush_batch()
+        completed = True
+    finally:
+        if parse_executor:
+            parse_executor.shutdown(cancel_futures=True)
+        checkpoint.close(completed)
+        if delta_file:
+            delta_file.close()
+
+    # O estado só é atualizado ao final de uma coleta completa, para que o delta
+    # de uma execução retomada ainda inclua os livros gravados antes da interrupção
+    _write_atomic(STATE_PATH, json.dumps(state).encode('utf-8'))
+    removed_count = len(previous_state.keys() - state.keys())
+
+    parquet_path = os.path.splitext(output_path)[0] + '.parquet' if parquet else None
+    if parquet_path:
+        write_parquet(output_path, parquet_path)
+
     # Logging de conclusão
+    elapsed = time.perf_counter() - started
     logging.info("=" * 50)
     logging.info("PROCESSO DE WEB SCRAPING CONCLUÍDO")
     logging.info(f"Total de livros coletados: {books_scraped_count}")
-    logging.info(f"Dados salvos em: '{OUTPUT_CSV_PATH}'")
+    logging.info(f"Livros novos ou alterados desde a última coleta: {changed_count} (não encontrados no site: {removed_count})")
+    if http_cache:
+        logging.info(f"Cache HTTP: {http_cache.revalidated} páginas não modificadas (304), {http_cache.downloaded} baixadas.")
+        logging.info(f"Delta salvo em: '{delta_path}'")
+    logging.info(f"Tempo total: {elapsed:.1f}s ({books_scraped_count / elapsed:.1f} livros/s)")
+    logging.info(f"Dados salvos em: '{output_path}'" + (f" e '{parquet_path}'" if parquet_path else ""))
     logging.info("=" * 50)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Web scraper do site books.toscrape.com.")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="Quantidade de downloads simultâneos (1 = sequencial).")
+    parser.add_argument('--base-url', default=BASE_URL, help="URL base do site (ex.: um servidor local de fixtures).")
+    parser.add_argument('--output', default=OUTPUT_CSV_PATH, help="Caminho do CSV de saída.")
+    parser.add_argument('--parquet', action='store_true', help="Também salva o resultado em Parquet, ao lado do CSV.")
+    parser.add_argument('--incremental', action='store_true', help="Usa o cache HTTP e grava os livros novos/alterados no CSV de delta.")
+    parser.add_argument('--delta-output', default=DELTA_CSV_PATH, help="Caminho do CSV de delta (modo incremental).")
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS, help="Processos de parsing (0 = parsing nas threads de download).")
+    parser.add_argument('--parser', default=PARSER_BACKEND, choices=['auto', *PARSERS], help="Backend de parsing do HTML.")
+    parser.add_argument('--restart', action='store_true', help="Ignora o checkpoint de uma execução interrompida.")
+    args = parser.parse_args()
+    main(concurrency=args.concurrency, base_url=args.base_url, output_path=args.output,
+         incremental=args.incremental, delta_path=args.delta_output, resume=not args.restart,
+         parser=args.parser, parse_workers=args.parse_workers,
+         parquet=args.parquet)
@@ -0,0 +1,194 @@
+"""
+Testes do scraper contra o site local de fixtures (`fixture_site.FixtureSite`), sem acesso à internet.
+
+Uso:
+    python -m unittest discover -s scripts -p 'test_*.py'
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import scraper  # noqa: E402
+from fixture_site import FIXTURES_DIR, FixtureSite  # noqa: E402
+
+EXPECTED_CSV_PATH = os.path.join(FIXTURES_DIR, 'expected_books.csv')
+# As URLs das capas em `expected_books.csv` usam a URL base do site real
+EXPECTED_BASE_URL = 'https://books.toscrape.com/'
+EMPTY_PAGE_SLUG = 'sharp-objects_997'
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+class FixtureSiteTestCase(unittest.TestCase):
+    """Base dos testes: isola os arquivos da coleta em um diretório temporário."""
+    def setUp(self):
+        # Checkpoint e estado da coleta ficam em um diretório temporário, fora de data/
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        for name, path in [('CHECKPOINT_PATH', 'checkpoint.jsonl'), ('STATE_PATH', 'state.json'),
+                           ('HTTP_CACHE_DIR', 'http_cache')]:
+            patcher = mock.patch.object(scraper, name, os.path.join(self.tmp_dir, path))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.output_path = os.path.join(self.tmp_dir, 'books.csv')
+        self.delta_path = os.path.join(self.tmp_dir, 'books_delta.csv')
+
+    def scrape(self, site, rate=0, resume=False, **kwargs):
+        """Roda a coleta completa contra o site de fixtures e retorna as linhas do CSV."""
+        kwargs.setdefault('parse_workers', 0)
+        with mock.patch.object(scraper, '_rate_limiter', scraper.HostRateLimiter(rate)):
+            scraper.main(base_url=site.url, output_path=self.output_path, delta_path=self.delta_path,
+                         resume=resume, **kwargs)
+        return read_rows(self.output_path)
+
+    def expected_rows(self, site):
+        rows = read_rows(EXPECTED_CSV_PATH)
+        for row in rows:
+            row['image_url'] = row['image_url'].replace(EXPECTED_BASE_URL, site.url)
+        return rows
+
+    def copy_fixtures(self):
+        """Copia as fixtures para um diretório temporário, para testes que alteram as páginas."""
+        directory = os.path.join(self.tmp_dir, 'site')
+        shutil.copytree(FIXTURES_DIR, directory)
+        return directory
+
+
+class ScraperFixtureSiteTest(FixtureSiteTestCase):
+    def test_csv_matches_expected_rows_for_every_parser(self):
+        with FixtureSite() as site:
+            for parser, (available, _, _) in scraper.PARSERS.items():
+                if not available:
+                    continue
+                with self.subTest(parser=parser):
+                    rows = self.scrape(site, concurrency=4, parser=parser, parse_workers=0)
+                    self.assertEqual(rows, self.expected_rows(site))
+
+    def test_csv_matches_expected_rows_with_parse_processes(self):
+        with FixtureSite() as site:
+            rows = self.scrape(site, concurrency=4, parser='html.parser', parse_workers=2)
+            self.assertEqual(rows, self.expected_rows(site))
+
+    def test_empty_page_is_skipped_by_every_parser(self):
+        directory = self.copy_fixtures()
+        with open(os.path.join(directory, 'catalogue', EMPTY_PAGE_SLUG, 'index.html'), 'wb'):
+            pass  # Resposta 200 com corpo vazio
+        with FixtureSite(directory) as site:
+            expected = [row for row in self.expected_rows(site) if row['title'] != 'Sharp Objects']
+            for parser, (available, _, _) in scraper.PARSERS.items():
+                if not available:
+                    continue
+                with self.subTest(parser=parser):
+                    self.assertIsNone(scraper.parse_book_details(site.url, b'', parser=parser))
+                    rows = self.scrape(site, concurrency=4, parser=parser, parse_workers=2)
+                    self.assertEqual(rows, expected)
+
+    def test_concurrency_is_bounded_per_host(self):
+        concurrency = 3
+        with FixtureSite(delay=0.05) as site:
+            self.scrape(site, concurrency=concurrency, parse_workers=0)
+        host = site.url.split('/')[2]
+        self.assertEqual(list(site.max_in_flight), [host])
+        # Os downloads das páginas de detalhes rodam em paralelo, limitados ao tamanho do pool;
+        # a navegação pela listagem roda na thread principal, ao mesmo tempo que eles
+        self.assertGreater(site.max_in_flight[host], 1)
+        self.assertLessEqual(site.max_in_flight[host], concurrency + 1)
+        self.assertEqual(len(site.requests), 9)  # 2 páginas de listagem + 7 livros
+
+    def test_rate_limit_spaces_requests_to_the_same_host(self):
+        rate = 20
+        with FixtureSite() as site:
+            self.scrape(site, rate=rate, concurrency=4, parse_workers=0)
+        arrivals = sorted(arrived for arrived, _, _ in site.requests)
+        gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+        # Tolerância para a imprecisão do time.sleep e o tempo entre a liberação e a chegada da requisição
+        self.assertGreaterEqual(min(gaps), 0.8 / rate)
+
+    def test_rate_limit_is_independent_per_host(self):
+        limiter = scraper.HostRateLimiter(5)
+        started = time.monotonic()
+        limiter.wait('http://a.example/page-1.html')
+        limiter.wait('http://b.example/page-1.html')
+        self.assertLess(time.monotonic() - started, 0.1)
+        limiter.wait('http://a.example/page-2.html')
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+
+
+
+class IncrementalScrapeTest(FixtureSiteTestCase):
+    """Coleta incremental: cache HTTP (304), detecção de alterações, CSV de delta e retomada pelo checkpoint."""
+    def setUp(self):
+        super().setUp()
+        self.site = FixtureSite(self.copy_fixtures()).start()
+        self.addCleanup(self.site.stop)
+
+    def edit_page(self, slug, old, new):
+        """Altera uma página de detalhes e avança a data de modificação (o Last-Modified tem resolução de segundos)."""
+        path = os.path.join(self.site.directory, 'catalogue', slug, 'index.html')
+        with open(path, encoding='utf-8') as page_file:
+            content = page_file.read()
+        self.assertIn(old, content)
+        with open(path, 'w', encoding='utf-8') as page_file:
+            page_file.write(content.replace(old, new))
+        modified = os.path.getmtime(path) + 10
+        os.utime(path, (modified, modified))
+
+    def test_unchanged_site_is_revalidated_and_gives_an_empty_delta(self):
+        self.scrape(self.site, incremental=True)
+        self.assertEqual(read_rows(self.delta_path), self.expected_rows(self.site))  # Primeira coleta: tudo é novo
+
+        self.site.reset()
+        rows = self.scrape(self.site, incremental=True)
+        self.assertEqual(rows, self.expected_rows(self.site))  # Corpos reaproveitados do cache
+        self.assertEqual(self.site.status_counts, {304: 9})
+        self.assertEqual(read_rows(self.delta_path), [])
+
+    def test_changed_page_gives_a_one_row_delta(self):
+        self.scrape(self.site, incremental=True)
+        self.edit_page(EMPTY_PAGE_SLUG, '£47.82', '£39.90')
+
+        self.site.reset()
+        rows = self.scrape(self.site, incremental=True)
+        self.assertEqual(self.site.status_counts, {200: 1, 304: 8})
+        changed = [row for row in self.expected_rows(self.site) if row['title'] == 'Sharp Objects']
+        changed[0]['price'] = '39.90'
+        self.assertEqual(read_rows(self.delta_path), changed)
+        self.assertIn(changed[0], rows)
+
+    def test_interrupted_run_resumes_from_the_checkpoint(self):
+        hashed = []
+        content_hash = scraper.content_hash
+
+        def interrupt_on_third_row(row):
+            # O terceiro livro é o primeiro do segundo lote, que já foi registrado no checkpoint
+            hashed.append(row)
+            if len(hashed) == 3:
+                raise KeyboardInterrupt
+            return content_hash(row)
+
+        with mock.patch.object(scraper, 'WRITE_BATCH_SIZE', 2), \
+                mock.patch.object(scraper, 'content_hash', interrupt_on_third_row):
+            with self.assertRaises(KeyboardInterrupt):
+                self.scrape(self.site)
+        self.assertTrue(os.path.exists(scraper.CHECKPOINT_PATH))
+
+        self.site.reset()
+        rows = self.scrape(self.site, resume=True)
+        self.assertEqual(rows, self.expected_rows(self.site))
+        fetched_books = [path for _, _, path in self.site.requests if path.endswith('/index.html')]
+        self.assertEqual(len(fetched_books), 3)  # Os 4 livros do checkpoint não são baixados de novo
+        self.assertFalse(os.path.exists(scraper.CHECKPOINT_PATH))
+
+
+if __name__ == '__main__':
+    unittest.main()